@@ -1,2 +1,4 @@
 from killer_sudoku.killer_sudoku import KillerSudoku
-from killer_sudoku.cage import Cage, CageBuilder
\ No newline at end of file
+from killer_sudoku.cage import Cage, CageBuilder
+from killer_sudoku.batch import solve_many, SolveResult
+from killer_sudoku.cache import SolutionCache, SqliteSolutionCache, canonical_key
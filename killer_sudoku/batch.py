@@ -0,0 +1,155 @@
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import chain, islice
+import os
+import time
+from killer_sudoku.cage import Cage, CageBuilder
+from killer_sudoku.killer_sudoku import KillerSudoku
+
+"""
+solve_many(sources, workers=None, chunksize=16, ordered=True)
+- sources: puzzles as cage text in the puzzles/ format, paths to such files as str or PathLike, KillerSudoku objects
+  or iterables of Cages
+- yields a SolveResult for every puzzle, fanning the work out over a process pool
+"""
+
+CageSource = Union[str, os.PathLike, KillerSudoku, Iterable[Cage]]
+
+class SolveResult(NamedTuple):
+  # Position of the puzzle in the iterable passed to solve_many
+  index: int
+  # 9x9 solved board, or None if the puzzle has no solution
+  board: Optional[List[List[int]]]
+  # Time spent in KillerSudoku.solve, excluding parsing
+  seconds: float
+  # Whether the result was answered from the cache without solving
+  cached: bool = False
+
+# Number of puzzles looked up in the cache, and of solved puzzles written to it, at a time
+_cache_chunk_size = 1024
+
+def solve_many(sources: Iterable[CageSource], workers: Optional[int] = None, chunksize: int = 16, ordered: bool = True, cache: Optional['SolutionCache'] = None) -> Iterator[SolveResult]:
+  """
+  Solves many Killer Sudokus in parallel
+
+  :param Iterable sources: Puzzles to solve. Paths, and strings naming an existing file, are read as cage text files.
+    Other strings are parsed as cage text
+  :param int workers: Number of worker processes, defaults to the number of CPUs. 1 solves in the current process
+  :param int chunksize: Number of puzzles sent to a worker at a time
+  :param bool ordered: Yield results in the order of sources, otherwise yield them as soon as they complete
+  :param SolutionCache cache: Cache consulted before solving, solved puzzles are stored in it in bulk
+
+  :return: Iterator of SolveResult, one per source
+  :raises ValueError: If workers or chunksize is less than 1, or if a string source is neither an existing file nor
+    cage text
+  """
+  if workers is None:
+    workers = os.cpu_count() or 1
+  if workers < 1:
+    raise ValueError("Must have at least 1 worker")
+  if chunksize < 1:
+    raise ValueError("Chunk size must be at least 1")
+  if cache is not None:
+    yield from _solve_many_cached(sources, workers, chunksize, ordered, cache)
+    return
+
+  chunks = _chunks(enumerate(sources), chunksize)
+  if workers == 1:
+    for chunk in chunks:
+      yield from _solve_chunk(chunk)
+    return
+
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    if ordered:
+      for results in executor.map(_solve_chunk, chunks):
+        yield from results
+    else:
+      futures = [executor.submit(_solve_chunk, chunk) for chunk in chunks]
+      for future in as_completed(futures):
+        yield from future.result()
+
+def _solve_many_cached(sources: Iterable[CageSource], workers: int, chunksize: int, ordered: bool, cache: 'SolutionCache') -> Iterator[SolveResult]:
+  # Puzzles are looked up a chunk at a time and only the misses are sent to the pool. The misses of a chunk are
+  # solved while the next chunk is parsed and looked up, so results stream instead of waiting for every lookup
+  lookups = (_lookup_chunk(chunk, cache) for chunk in _chunks(enumerate(sources), _cache_chunk_size))
+  if workers == 1:
+    for hits, misses, keys in lookups:
+      solved = chain.from_iterable(map(_solve_chunk, _chunks(misses, chunksize)))
+      yield from _cached_results(hits, misses, keys, solved, ordered, cache)
+    return
+
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    pending = None
+    for hits, misses, keys in lookups:
+      futures = [executor.submit(_solve_chunk, chunk) for chunk in _chunks(misses, chunksize)]
+      if pending is not None:
+        yield from _cached_results(*pending, ordered, cache)
+      solved = chain.from_iterable(future.result() for future in (futures if ordered else as_completed(futures)))
+      pending = (hits, misses, keys, solved)
+    if pending is not None:
+      yield from _cached_results(*pending, ordered, cache)
+
+def _lookup_chunk(chunk: List[Tuple[int, CageSource]], cache: 'SolutionCache') -> Tuple[List[SolveResult], List[Tuple[int, KillerSudoku]], List]:
+  # Returns the hits of a chunk, the (index, puzzle) pairs of its misses in order and the cache key of each miss
+  hits = []
+  misses = []
+  keys = []
+  for index, source in chunk:
+    ks = _to_killer_sudoku(source)
+    key = cache.key(ks)
+    hit, board = cache.lookup(ks, key)
+    if hit:
+      hits.append(SolveResult(index, board, 0.0, True))
+    else:
+      misses.append((index, ks))
+      keys.append(key)
+  return hits, misses, keys
+
+def _cached_results(hits: List[SolveResult], misses: List[Tuple[int, KillerSudoku]], keys: List, solved: Iterable[SolveResult], ordered: bool, cache: 'SolutionCache') -> Iterator[SolveResult]:
+  # Yields the hits and solved misses of a chunk, merged by index when ordered, then stores the solved misses
+  if not ordered:
+    yield from hits
+  positions = {index: position for position, (index, _) in enumerate(misses)}
+  stored = []
+  next_hit = 0
+  for result in solved:
+    position = positions[result.index]
+    stored.append((misses[position][1], result.board, keys[position]))
+    if ordered:
+      while next_hit < len(hits) and hits[next_hit].index < result.index:
+        yield hits[next_hit]
+        next_hit += 1
+    yield result
+  if ordered:
+    yield from hits[next_hit:]
+  cache.store_many(stored)
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+  items = iter(items)
+  chunk = list(islice(items, size))
+  while chunk:
+    yield chunk
+    chunk = list(islice(items, size))
+
+def _solve_chunk(chunk: List[Tuple[int, CageSource]]) -> List[SolveResult]:
+  return [_solve_one(index, source) for index, source in chunk]
+
+def _solve_one(index: int, source: CageSource) -> SolveResult:
+  ks = _to_killer_sudoku(source)
+  start_time = time.perf_counter()
+  solution = ks.solve()
+  seconds = time.perf_counter() - start_time
+  return SolveResult(index, solution.board if solution is not None else None, seconds)
+
+def _to_killer_sudoku(source: CageSource) -> KillerSudoku:
+  if isinstance(source, KillerSudoku):
+    return source
+  if isinstance(source, os.PathLike) or isinstance(source, str) and os.path.isfile(source):
+    with open(source, 'r') as f:
+      source = f.read()
+  if isinstance(source, str):
+    try:
+      source = CageBuilder(source).cages
+    except (ValueError, IndexError) as e:
+      raise ValueError(f"Source is neither an existing file nor cage text: {source[:80]!r}") from e
+  return KillerSudoku(cages=source)
@@ -0,0 +1,215 @@
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from killer_sudoku.corpus import PackedCorpus
+from killer_sudoku.killer_sudoku import KillerSudoku, _Solver, engines
+from killer_sudoku.parser import parse_puzzles
+
+"""
+Benchmark for the solver over a directory of puzzles
+
+python -m killer_sudoku.bench [puzzles_dir or packed corpus] [--limit N] [--repeat N] [--output results.json] [--baseline old.json]
+  [--max-subset-size N] [--engine propagation|dlx|sat]
+- The first pass over the corpus is the cold run, every further pass is a warm run
+- Reports p50/p90/p99/max solve times, nodes explored and memory per loaded puzzle, and can write them as JSON
+  to diff across versions. Solve times include building the solver, as in KillerSudoku.solve, and the setup
+  part is also reported on its own
+- Engines are compared by writing the report of one and passing it as the baseline of another, e.g.
+  --engine propagation --output propagation.json, then --engine dlx --baseline propagation.json
+"""
+
+# Relative slowdown of a percentile against the baseline that is reported as a regression
+regression_threshold = 0.10
+
+def load_corpus(directory: str, limit: Optional[int] = None) -> List[Tuple[str, KillerSudoku]]:
+  """
+  Loads every puzzle*.txt file in a directory ordered by name, or every puzzle in a packed corpus file
+
+  :param str directory: Directory containing puzzles in the cage text format, or a packed corpus file
+  :param int limit: Maximum number of puzzles to load
+
+  :return: List of (puzzle name, KillerSudoku) pairs
+  """
+  if os.path.isfile(directory):
+    with PackedCorpus(directory) as packed:
+      count = len(packed) if limit is None else min(limit, len(packed))
+      return [(f"puzzle{packed.number(position):05}", packed[position]) for position in range(count)]
+
+  names = sorted(name for name in os.listdir(directory) if name.startswith('puzzle') and name.endswith('.txt'))
+  if limit is not None:
+    names = names[:limit]
+  corpus = []
+  for name in names:
+    with open(os.path.join(directory, name), 'rb') as f:
+      corpus.extend((name[:-len('.txt')], ks) for ks in parse_puzzles(f))
+  return corpus
+
+def run_pass(corpus: Sequence[Tuple[str, KillerSudoku]], max_subset_size: int = 2, engine: str = 'propagation') -> List[Mapping]:
+  """
+  Solves every puzzle in the corpus once
+
+  :param int max_subset_size: Largest naked and hidden subsets the propagation solver searches for
+  :param str engine: Solving backend, one of the keys of killer_sudoku.killer_sudoku.engines
+
+  :return: List with the name, time in nanoseconds, nodes explored, candidates eliminated by each kind of subset
+    and solved flag of each puzzle. The time includes building the solver, which KillerSudoku.solve also pays,
+    and setup_ns is the part of it spent building the solver
+  """
+  results = []
+  for name, ks in corpus:
+    start_time = time.perf_counter_ns()
+    solver = _Solver(ks, max_subset_size=max_subset_size) if engine == 'propagation' else engines[engine](ks)
+    setup_time = time.perf_counter_ns()
+    solution = solver.solve()
+    ns = time.perf_counter_ns() - start_time
+    results.append({
+      'name': name,
+      'ns': ns,
+      'setup_ns': setup_time - start_time,
+      'nodes': solver.nodes,
+      'subset_eliminations': dict(getattr(solver, 'subset_eliminations', {})),
+      'solved': solution is not None
+    })
+  return results
+
+def percentile(sorted_values: Sequence[int], fraction: float) -> int:
+  """
+  Returns the nearest-rank percentile of an ascending sequence
+  """
+  if len(sorted_values) == 0:
+    return 0
+  rank = max(1, math.ceil(len(sorted_values) * fraction))
+  return sorted_values[rank - 1]
+
+def summarize(results: Iterable[Mapping]) -> Mapping:
+  """
+  Returns count, solved count, time and node statistics and total subset eliminations for the results of one or
+  more passes
+  """
+  results = list(results)
+  times = sorted(r['ns'] for r in results)
+  setup_times = sorted(r.get('setup_ns', 0) for r in results)
+  nodes = sorted(r['nodes'] for r in results)
+  subset_eliminations = {}
+  for r in results:
+    for kind, count in r.get('subset_eliminations', {}).items():
+      subset_eliminations[kind] = subset_eliminations.get(kind, 0) + count
+  return {
+    'count': len(results),
+    'solved': sum(1 for r in results if r['solved']),
+    'total_ns': sum(times),
+    'mean_ns': sum(times) // len(times) if times else 0,
+    'p50_ns': percentile(times, 0.50),
+    'p90_ns': percentile(times, 0.90),
+    'p99_ns': percentile(times, 0.99),
+    'max_ns': times[-1] if times else 0,
+    'total_setup_ns': sum(setup_times),
+    'p50_setup_ns': percentile(setup_times, 0.50),
+    'total_nodes': sum(nodes),
+    'p50_nodes': percentile(nodes, 0.50),
+    'max_nodes': nodes[-1] if nodes else 0,
+    'subset_eliminations': subset_eliminations
+  }
+
+def run(directory: str, limit: Optional[int] = None, repeat: int = 2, max_subset_size: int = 2, engine: str = 'propagation') -> Mapping:
+  """
+  Benchmarks the solver on a corpus, with one cold pass followed by repeat - 1 warm passes
+
+  :return: JSON serializable report with environment details and per-run summaries and results
+  """
+  if repeat < 1:
+    raise ValueError("Must run at least 1 pass")
+  # Memory still allocated after loading is what the loaded puzzles take
+  tracemalloc.start()
+  corpus = load_corpus(directory, limit)
+  memory, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  cold = run_pass(corpus, max_subset_size, engine)
+  warm = []
+  for _ in range(repeat - 1):
+    warm.extend(run_pass(corpus, max_subset_size, engine))
+  report = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'machine': platform.machine(),
+    'corpus': os.path.abspath(directory),
+    'repeat': repeat,
+    'engine': engine,
+    'max_subset_size': max_subset_size,
+    'memory_per_puzzle_bytes': memory // len(corpus) if corpus else 0,
+    'runs': {'cold': {'summary': summarize(cold), 'puzzles': cold}}
+  }
+  if warm:
+    report['runs']['warm'] = {'summary': summarize(warm), 'puzzles': warm}
+  return report
+
+def _format_ns(ns: int) -> str:
+  if ns >= 1_000_000_000:
+    return f"{ns / 1_000_000_000:.2f}s"
+  if ns >= 1_000_000:
+    return f"{ns / 1_000_000:.2f}ms"
+  return f"{ns / 1_000:.1f}us"
+
+def print_report(report: Mapping, baseline: Optional[Mapping] = None) -> List[str]:
+  """
+  Prints the summary of each run, and the change against a baseline report if given
+
+  :return: Descriptions of the percentiles that regressed by more than regression_threshold against the baseline
+  """
+  regressions = []
+  print(f"engine: {report.get('engine', 'propagation')}, memory per puzzle: {report['memory_per_puzzle_bytes']} bytes")
+  for run_name, run_report in report['runs'].items():
+    summary = run_report['summary']
+    print(f"{run_name}: {summary['solved']}/{summary['count']} solved, "
+          f"p50 {_format_ns(summary['p50_ns'])}, p90 {_format_ns(summary['p90_ns'])}, "
+          f"p99 {_format_ns(summary['p99_ns'])}, max {_format_ns(summary['max_ns'])}, "
+          f"mean {_format_ns(summary['mean_ns'])}, setup p50 {_format_ns(summary.get('p50_setup_ns', 0))}, "
+          f"nodes p50 {summary['p50_nodes']} max {summary['max_nodes']}")
+    eliminations = {kind: count for kind, count in summary.get('subset_eliminations', {}).items() if count}
+    if eliminations:
+      print(f"  subset eliminations: {', '.join(f'{kind} {count}' for kind, count in eliminations.items())}")
+    if baseline is None or run_name not in baseline['runs']:
+      continue
+    old_summary = baseline['runs'][run_name]['summary']
+    for key in ('p50_ns', 'p90_ns', 'p99_ns', 'max_ns'):
+      if old_summary[key] == 0:
+        continue
+      change = summary[key] / old_summary[key] - 1
+      print(f"  {key[:-3]}: {_format_ns(old_summary[key])} -> {_format_ns(summary[key])} ({change:+.1%})")
+      if change > regression_threshold:
+        regressions.append(f"{run_name} {key[:-3]} {change:+.1%}")
+  return regressions
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  parser = argparse.ArgumentParser(prog='python -m killer_sudoku.bench', description="Benchmark the Killer Sudoku solver")
+  parser.add_argument('directory', nargs='?', default='puzzles', help="directory of puzzle*.txt files or a packed corpus file, defaults to puzzles")
+  parser.add_argument('--limit', type=int, default=None, help="only solve the first N puzzles")
+  parser.add_argument('--repeat', type=int, default=2, help="number of passes, the first is cold and the rest are warm")
+  parser.add_argument('--output', default=None, help="write the JSON report to this file")
+  parser.add_argument('--baseline', default=None, help="JSON report of a previous run to compare against")
+  parser.add_argument('--max-subset-size', type=int, default=2, help="largest naked and hidden subsets to search for, 0 disables them")
+  parser.add_argument('--engine', choices=list(engines), default='propagation', help="solving backend, defaults to propagation")
+  args = parser.parse_args(argv)
+
+  report = run(args.directory, args.limit, args.repeat, args.max_subset_size, args.engine)
+  baseline = None
+  if args.baseline is not None:
+    with open(args.baseline, 'r') as f:
+      baseline = json.load(f)
+  regressions = print_report(report, baseline)
+  if args.output is not None:
+    with open(args.output, 'w') as f:
+      json.dump(report, f, indent=2)
+  if regressions:
+    print(f"Regressions: {', '.join(regressions)}")
+    return 1
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
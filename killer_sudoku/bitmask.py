@@ -0,0 +1,37 @@
+"""
+Candidate digits for a cell are stored as a 9-bit integer where bit (d - 1) is set if digit d is
+still possible. The whole grid is a flat 81-slot array indexed by i * 9 + j.
+"""
+
+# Mask with all digits 1-9 possible
+all_digits = 0b111111111
+
+# key: candidate bitmask
+# value: number of digits in the bitmask
+popcount_table = [bin(mask).count('1') for mask in range(all_digits + 1)]
+
+# key: candidate bitmask
+# value: smallest digit in the bitmask, 0 for the empty bitmask
+lowest_digit_table = [(mask & -mask).bit_length() for mask in range(all_digits + 1)]
+
+# key: candidate bitmask
+# value: largest digit in the bitmask, 0 for the empty bitmask
+highest_digit_table = [mask.bit_length() for mask in range(all_digits + 1)]
+
+# key: candidate bitmask
+# value: sum of the digits in the bitmask
+digit_sum_table = [sum(d for d in range(1, 10) if mask & (1 << (d - 1))) for mask in range(all_digits + 1)]
+
+# key: digit d in the range [0, 10]
+# value: bitmask of the digits >= d
+digits_at_least_table = [all_digits & ~((1 << max(d - 1, 0)) - 1) for d in range(10)] + [0]
+
+# key: digit d in the range [0, 10]
+# value: bitmask of the digits <= d
+digits_at_most_table = [(1 << d) - 1 for d in range(10)] + [all_digits]
+
+def digit_mask(digit: int) -> int:
+  """
+  Returns the bitmask containing only the given digit
+  """
+  return 1 << (digit - 1)
@@ -0,0 +1,289 @@
+from typing import Iterable, List, Optional, Tuple, Union
+from collections import OrderedDict
+from hashlib import blake2b
+from itertools import permutations
+from operator import itemgetter
+import os
+import sqlite3
+from killer_sudoku.killer_sudoku import KillerSudoku
+
+"""
+Canonical puzzle keys and a size-bounded cache of solutions in front of KillerSudoku.solve
+
+canonical_key(ks, symmetries=False)
+- the key only depends on the board and on the set of cages, not on the order of cages or of cells in a cage
+- with symmetries, puzzles that are equal up to rotations, reflections and band/stack permutations share a key
+
+ks.solve(cache=SolutionCache(maxsize=4096, symmetries=True))
+- solutions are stored in the frame of the canonical key, so a hit for a symmetric puzzle is mapped back
+
+SqliteSolutionCache(path, max_entries=1000000, symmetries=False)
+- persistent cache in a local sqlite file in WAL mode with the same interface, so it survives restarts
+- entries are evicted first in, first out, since lookups don't refresh them
+"""
+
+# Size of a canonical key in bytes
+key_size = 16
+
+# key: (i, j) cell coordinates, value: the coordinates after each of the 8 rotations and reflections of the grid
+_dihedral_maps = (
+  lambda i, j: (i, j),
+  lambda i, j: (j, 8 - i),
+  lambda i, j: (8 - i, 8 - j),
+  lambda i, j: (8 - j, i),
+  lambda i, j: (i, 8 - j),
+  lambda i, j: (8 - i, j),
+  lambda i, j: (j, i),
+  lambda i, j: (8 - j, 8 - i)
+)
+
+def _build_transforms() -> Tuple[Tuple[int, ...], ...]:
+  # Every composition of a band permutation, a stack permutation and a rotation or reflection, as a map from each
+  # flat cell index to its index after the transform. These form a group of 288 transforms, so the minimum over
+  # the transforms of a puzzle is the same for every puzzle that is symmetric to it
+  transforms = []
+  for bands in permutations(range(3)):
+    for stacks in permutations(range(3)):
+      for dihedral in _dihedral_maps:
+        transform = []
+        for idx in range(81):
+          i, j = divmod(idx, 9)
+          i, j = dihedral(bands[i // 3] * 3 + i % 3, stacks[j // 3] * 3 + j % 3)
+          transform.append(i * 9 + j)
+        transforms.append(tuple(transform))
+  return tuple(transforms)
+
+# The identity transform
+_identity = tuple(range(81))
+
+# Each transform with a getter of the board values in transformed cell order and the cell moved to index 0
+_transforms: Optional[Tuple[Tuple[Tuple[int, ...], itemgetter, int], ...]] = None
+
+def _get_transforms() -> Tuple[Tuple[Tuple[int, ...], itemgetter, int], ...]:
+  global _transforms
+  if _transforms is None:
+    transforms = []
+    for transform in _build_transforms():
+      inverse = [0] * 81
+      for idx, target in enumerate(transform):
+        inverse[target] = idx
+      transforms.append((transform, itemgetter(*inverse), inverse[0]))
+    _transforms = tuple(transforms)
+  return _transforms
+
+def _encode(ks: KillerSudoku, transform: Tuple[int, ...]) -> bytes:
+  # Board values in transformed cell order, followed by each cage's sorted cells, a 0xFF separator and its sum.
+  # Cages are sorted by their cells, which is unambiguous since no two cages share a cell
+  board = bytearray(81)
+  for idx, value in enumerate(ks._board):
+    board[transform[idx]] = value
+  cages = sorted(bytes(sorted(transform[idx] for idx in cage.indices)) + bytes((0xFF, cage.sum)) for cage in ks.cages)
+  return bytes(board) + b''.join(cages)
+
+def _min_encoding(ks: KillerSudoku) -> Tuple[bytes, Tuple[int, ...]]:
+  # The encoding starts with the board and then the cage containing cell 0, since its sorted cells start with 0.
+  # No encoding of this prefix is a prefix of another one, so the minimum encoding is among the transforms with the
+  # minimum prefix, and only those are fully encoded. Usually one or a few of the 288 transforms are left
+  cell_cages = [None] * 81
+  for cage in ks.cages:
+    for idx in cage.indices:
+      cell_cages[idx] = cage
+  board = bytes(ks._board)
+  best = None
+  ties = []
+  for transform, board_getter, first in _get_transforms():
+    cage = cell_cages[first]
+    prefix = bytes(board_getter(board)) + bytes(sorted(transform[idx] for idx in cage.indices)) + bytes((0xFF, cage.sum))
+    if best is None or prefix < best:
+      best = prefix
+      ties = [transform]
+    elif prefix == best:
+      ties.append(transform)
+  return min((_encode(ks, transform), transform) for transform in ties)
+
+def canonical_key(ks: KillerSudoku, symmetries: bool = False) -> Tuple[bytes, Tuple[int, ...]]:
+  """
+  Returns a canonical key for a puzzle and the transform from the puzzle's cells to the key's frame
+
+  :param KillerSudoku ks: Puzzle to compute the key of
+  :param bool symmetries: Give the same key to puzzles equal up to rotations, reflections and band/stack permutations
+
+  :return: (key, transform) where key is a key_size bytes digest and transform[idx] is the index in the key's
+    frame of the puzzle's cell idx
+  """
+  if symmetries:
+    encoding, transform = _min_encoding(ks)
+  else:
+    encoding, transform = _encode(ks, _identity), _identity
+  return blake2b(encoding, digest_size=key_size).digest(), transform
+
+def to_canonical(board: List[List[int]], transform: Tuple[int, ...]) -> bytes:
+  """
+  Packs a 9x9 board into 81 bytes in the frame of a canonical key
+  """
+  canonical = bytearray(81)
+  for idx in range(81):
+    canonical[transform[idx]] = board[idx // 9][idx % 9]
+  return bytes(canonical)
+
+def from_canonical(canonical: bytes, transform: Tuple[int, ...]) -> List[List[int]]:
+  """
+  Unpacks 81 bytes in the frame of a canonical key into a 9x9 board in the puzzle's frame
+  """
+  values = [canonical[transform[idx]] for idx in range(81)]
+  return [values[i * 9:i * 9 + 9] for i in range(9)]
+
+class _KeyedCache:
+  # Key computation and hit/miss counters shared by the in-process and sqlite caches
+  def __init__(self, symmetries: bool):
+    self.symmetries = symmetries
+    self.hits = 0
+    self.misses = 0
+
+  def key(self, ks: KillerSudoku) -> Tuple[bytes, Tuple[int, ...]]:
+    """
+    Returns the canonical key and transform of a puzzle, which can be passed to lookup and store to compute it once
+    """
+    return canonical_key(ks, self.symmetries)
+
+class SolutionCache(_KeyedCache):
+  def __init__(self, maxsize: int = 4096, symmetries: bool = False):
+    """
+    Initializes an in-process LRU cache from canonical puzzle keys to solutions
+
+    :param int maxsize: Maximum number of puzzles kept, the least recently used puzzle is evicted first
+    :param bool symmetries: Share entries between puzzles equal up to rotations, reflections and band/stack permutations
+
+    :raises ValueError: If maxsize is less than 1
+    """
+    if maxsize < 1:
+      raise ValueError("Cache size must be at least 1")
+    super().__init__(symmetries)
+    self.maxsize = maxsize
+    # key: canonical key, value: 81-byte canonical solution, or b'' if the puzzle has no solution
+    self._entries = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def lookup(self, ks: KillerSudoku, key: Optional[Tuple[bytes, Tuple[int, ...]]] = None) -> Tuple[bool, Optional[List[List[int]]]]:
+    """
+    Looks up the solution of a puzzle
+
+    :param KillerSudoku ks: Puzzle to look up
+    :param key: Result of key(ks) if it was already computed
+
+    :return: (hit, board) where board is the solved 9x9 board, or None on a miss or if the puzzle has no solution
+    """
+    key, transform = key if key is not None else self.key(ks)
+    canonical = self._entries.get(key)
+    if canonical is None:
+      self.misses += 1
+      return False, None
+    self._entries.move_to_end(key)
+    self.hits += 1
+    return True, from_canonical(canonical, transform) if canonical else None
+
+  def store(self, ks: KillerSudoku, board: Optional[List[List[int]]], key: Optional[Tuple[bytes, Tuple[int, ...]]] = None) -> None:
+    """
+    Stores the solution of a puzzle, or None if the puzzle has no solution
+
+    :param KillerSudoku ks: Puzzle that was solved
+    :param board: Solved 9x9 board, or None if the puzzle has no solution
+    :param key: Result of key(ks) if it was already computed
+    """
+    key, transform = key if key is not None else self.key(ks)
+    self._entries[key] = to_canonical(board, transform) if board is not None else b''
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.maxsize:
+      self._entries.popitem(last=False)
+
+  def store_many(self, entries: Iterable[Tuple[KillerSudoku, Optional[List[List[int]]], Optional[Tuple[bytes, Tuple[int, ...]]]]]) -> None:
+    """
+    Stores many solutions at once
+
+    :param entries: (puzzle, board, key) triples with the same meaning as the arguments of store
+    """
+    for ks, board, key in entries:
+      self.store(ks, board, key)
+
+  def clear(self) -> None:
+    self._entries.clear()
+    self.hits = 0
+    self.misses = 0
+
+class SqliteSolutionCache(_KeyedCache):
+  def __init__(self, path: Union[str, os.PathLike], max_entries: int = 1_000_000, symmetries: bool = False):
+    """
+    Opens or creates a persistent cache of solutions in a local sqlite file, with the same interface as SolutionCache.
+    Eviction is first in, first out: lookups don't refresh an entry, so the oldest stored entries are evicted first
+
+    :param path: Path of the sqlite file
+    :param int max_entries: Maximum number of puzzles kept
+    :param bool symmetries: Share entries between puzzles equal up to rotations, reflections and band/stack permutations.
+      Must be the same every time the file is opened since it changes the keys
+
+    :raises ValueError: If max_entries is less than 1
+    """
+    if max_entries < 1:
+      raise ValueError("Cache size must be at least 1")
+    super().__init__(symmetries)
+    self.max_entries = max_entries
+    self._connection = sqlite3.connect(os.fspath(path))
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.execute("PRAGMA synchronous=NORMAL")
+    # The rowid gives the insertion order used for eviction. Rows are only ever inserted with the next rowid and
+    # evicted from the lowest rowid, so the rowids of the table are a contiguous range. solution is 81 bytes, or
+    # empty if there is no solution
+    self._connection.execute("CREATE TABLE IF NOT EXISTS solutions (key BLOB NOT NULL UNIQUE, solution BLOB NOT NULL)")
+    self._connection.commit()
+
+  def __len__(self) -> int:
+    # Other processes can write to the same file, so the size is read from the rowid range rather than tracked
+    # Separate MAX and MIN subqueries so each one is a single index lookup
+    return self._connection.execute(
+      "SELECT COALESCE((SELECT MAX(rowid) FROM solutions) - (SELECT MIN(rowid) FROM solutions) + 1, 0)"
+    ).fetchone()[0]
+
+  def __enter__(self) -> 'SqliteSolutionCache':
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  def close(self) -> None:
+    self._connection.close()
+
+  def lookup(self, ks: KillerSudoku, key: Optional[Tuple[bytes, Tuple[int, ...]]] = None) -> Tuple[bool, Optional[List[List[int]]]]:
+    key, transform = key if key is not None else self.key(ks)
+    row = self._connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+    if row is None:
+      self.misses += 1
+      return False, None
+    self.hits += 1
+    return True, from_canonical(row[0], transform) if row[0] else None
+
+  def store(self, ks: KillerSudoku, board: Optional[List[List[int]]], key: Optional[Tuple[bytes, Tuple[int, ...]]] = None) -> None:
+    self.store_many(((ks, board, key),))
+
+  def store_many(self, entries: Iterable[Tuple[KillerSudoku, Optional[List[List[int]]], Optional[Tuple[bytes, Tuple[int, ...]]]]]) -> None:
+    """
+    Stores many solutions in a single transaction, then evicts the oldest entries above max_entries
+    """
+    rows = []
+    for ks, board, key in entries:
+      key, transform = key if key is not None else self.key(ks)
+      rows.append((key, to_canonical(board, transform) if board is not None else b''))
+    with self._connection:
+      self._connection.executemany("INSERT OR IGNORE INTO solutions (key, solution) VALUES (?, ?)", rows)
+      # The rowids are contiguous, so the newest max_entries rows are the ones within max_entries of the largest
+      # rowid. Both lookups use the rowid index, so this doesn't scan the table
+      self._connection.execute(
+        "DELETE FROM solutions WHERE rowid <= (SELECT MAX(rowid) FROM solutions) - ?", (self.max_entries,)
+      )
+
+  def clear(self) -> None:
+    with self._connection:
+      self._connection.execute("DELETE FROM solutions")
+    self.hits = 0
+    self.misses = 0
@@ -2,6 +2,9 @@ from typing import Iterable, Mapping, Optional, Tuple, Union
 from killer_sudoku.static_data import *
 
 class Cage:
+  # Cells are packed into bytes of flat indices i*9+j so a cage is a small immutable object
+  __slots__ = ('sum', 'indices')
+
   def __init__(self, sum: int, cells: Iterable[Tuple[int, int]]):
     """
     Initializes a cage for a Killer Sudoku
@@ -15,6 +18,7 @@ class Cage:
     """
 
     # Validate inputs
+    cells = tuple(cells)
     if len(cells) < 1 or len(cells) > 9:
       raise ValueError("Must have 1-9 cells in a cage")
     cage_sum_min, cage_sum_max = possible_cage_sum_min_max[len(cells)]
@@ -26,14 +30,40 @@ class Cage:
       if cell[0] < 0 or cell[0] > 8 or cell[1] < 0 or cell[1] > 8:
         raise ValueError(f"Cell {cell} is out of bounds for a 9x9 puzzle. Coordinates must be in the range [0-8]")
     
-    self.sum = sum
-    self.cells = cells
+    object.__setattr__(self, 'sum', sum)
+    object.__setattr__(self, 'indices', bytes(i * 9 + j for i, j in cells))
+
+  @classmethod
+  def _from_indices(cls, sum: int, indices: bytes) -> 'Cage':
+    """
+    Creates a cage from packed flat cell indices without validating it, for inputs that are validated in bulk
+    """
+    cage = object.__new__(cls)
+    object.__setattr__(cage, 'sum', sum)
+    object.__setattr__(cage, 'indices', bytes(indices))
+    return cage
+
+  @property
+  def cells(self) -> Tuple[Tuple[int, int], ...]:
+    """
+    (i, j) coordinates of each cell in the cage
+    """
+    return tuple(divmod(idx, 9) for idx in self.indices)
+
+  def __setattr__(self, name, value):
+    raise AttributeError("Cage is immutable")
+
+  def __delattr__(self, name):
+    raise AttributeError("Cage is immutable")
+
+  def __reduce__(self):
+    return (Cage._from_indices, (self.sum, self.indices))
 
   def __len__(self) -> int:
-    return len(self.cells)
+    return len(self.indices)
 
   def __repr__(self) -> str:
-    return f"<Cage: {{sum: {self.sum}, cells: {self.cells}}}>"
+    return f"<Cage: {{sum: {self.sum}, cells: {list(self.cells)}}}>"
 
 class CageBuilder:
   def __init__(self, cages: Optional[Union[str, Iterable[Union[Mapping, Iterable]]]] = None):
@@ -48,12 +78,13 @@ class CageBuilder:
           sum = int(numbers[0])
           cells = [(int(n[0]),int(n[1])) for n in numbers[1:]]
           self.cages.append(Cage(sum, cells))
-    elif type(cages) == Iterable:
+    elif cages is not None:
       for cage in cages:
-        if type(cage) == dict:
+        if isinstance(cage, Mapping):
           self.cages.append(Cage(cage['sum'], [tuple(cell) for cell in cage['cells']]))
-        elif type(cage) == list:
-          self.cages.append(Cage(cage[0], [tuple(cell) for cell in cage[1]]))
+        else:
+          cage_sum, cells = cage
+          self.cages.append(Cage(cage_sum, [tuple(cell) for cell in cells]))
 
   def add(self, cage: Cage) -> None:
     """
@@ -61,4 +92,4 @@ class CageBuilder:
 
     :param Cage cage: Cage to be added to the CageBuilder
     """
-    self.cages.add(cage)
\ No newline at end of file
+    self.cages.append(cage)
\ No newline at end of file
@@ -0,0 +1,210 @@
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Union
+from bisect import bisect_left
+import argparse
+import mmap
+import os
+import re
+import struct
+import sys
+from killer_sudoku.cage import Cage
+from killer_sudoku.killer_sudoku import KillerSudoku
+from killer_sudoku.parser import parse_puzzles
+
+"""
+Packed single-file corpus of puzzles that is memory-mapped for random access
+
+Layout, all integers little-endian:
+- header: magic b'KSPK', version u16, record size u16, puzzle count u32, reserved u32
+- numbers: u32 puzzle number of each puzzle, ascending
+- offsets: u32 file offset of the first cage record of each puzzle, plus the end offset of the last puzzle
+- records: one fixed-width record per cage, the sum u8, the number of cells u8 and 9 flat cell indices
+  u8 padded with 0xFF
+
+python -m killer_sudoku.corpus puzzles puzzles.kspk
+- packs the puzzle*.txt files of a directory, or an archive of puzzles, into a packed corpus
+"""
+
+magic = b'KSPK'
+version = 1
+record_size = 11
+
+_header = struct.Struct('<4sHHII')
+_u32 = struct.Struct('<I')
+_puzzle_file_name = re.compile(r'puzzle(\d+)\.txt$')
+
+def pack_corpus(puzzles: Iterable[Tuple[int, KillerSudoku]], path: Union[str, os.PathLike]) -> int:
+  """
+  Writes puzzles to a packed corpus file
+
+  :param puzzles: (puzzle number, KillerSudoku) pairs in ascending puzzle number order
+  :param path: Path of the packed corpus to write
+
+  :return: Number of puzzles written
+  :raises ValueError: If puzzle numbers aren't strictly ascending
+  """
+  numbers = []
+  records = []
+  for number, ks in puzzles:
+    if numbers and number <= numbers[-1]:
+      raise ValueError("Puzzle numbers must be strictly ascending")
+    numbers.append(number)
+    records.append(b''.join(
+      bytes((cage.sum, len(cage))) + cage.indices + b'\xff' * (9 - len(cage)) for cage in ks.cages
+    ))
+
+  offset = _header.size + _u32.size * (2 * len(numbers) + 1)
+  offsets = []
+  for record in records:
+    offsets.append(offset)
+    offset += len(record)
+  offsets.append(offset)
+
+  with open(path, 'wb') as f:
+    f.write(_header.pack(magic, version, record_size, len(numbers), 0))
+    f.write(struct.pack(f'<{len(numbers)}I', *numbers))
+    f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+    for record in records:
+      f.write(record)
+  return len(numbers)
+
+def iter_numbered_puzzles(path: Union[str, os.PathLike]) -> Iterator[Tuple[int, KillerSudoku]]:
+  """
+  Yields (puzzle number, KillerSudoku) pairs from the puzzleNNNNN.txt files of a directory, or from an archive
+  where puzzles are numbered from 1 in the order they appear
+  """
+  if os.path.isdir(path):
+    numbered = []
+    for name in os.listdir(path):
+      match = _puzzle_file_name.match(name)
+      if match:
+        numbered.append((int(match.group(1)), name))
+    for number, name in sorted(numbered):
+      with open(os.path.join(path, name), 'rb') as f:
+        for ks in parse_puzzles(f):
+          yield number, ks
+  else:
+    with open(path, 'rb') as f:
+      yield from enumerate(parse_puzzles(f), start=1)
+
+class PackedCorpus:
+  def __init__(self, path: Union[str, os.PathLike]):
+    """
+    Opens a packed corpus as a read-only memory map
+
+    :param path: Path of a file written by pack_corpus
+
+    :raises ValueError: If the file isn't a packed corpus of a supported version
+    """
+    with open(path, 'rb') as f:
+      self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    self._view = memoryview(self._mmap)
+    if len(self._view) < _header.size:
+      self.close()
+      raise ValueError(f"{path} is not a packed corpus")
+    file_magic, file_version, file_record_size, self._count, _ = _header.unpack_from(self._view)
+    if file_magic != magic or file_version != version or file_record_size != record_size:
+      self.close()
+      raise ValueError(f"{path} is not a version {version} packed corpus")
+    self._numbers_offset = _header.size
+    self._offsets_offset = self._numbers_offset + _u32.size * self._count
+
+  def __len__(self) -> int:
+    return self._count
+
+  def __getitem__(self, position: int) -> KillerSudoku:
+    """
+    Returns the puzzle at a position in the corpus, ordered by puzzle number
+    """
+    return self._build(self.records(position))
+
+  def __iter__(self) -> Iterator[KillerSudoku]:
+    for position in range(self._count):
+      yield self[position]
+
+  def __enter__(self) -> 'PackedCorpus':
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  def close(self) -> None:
+    """
+    Closes the corpus. Views returned by records() stay valid, the memory map is then unmapped once the last of
+    them is released or garbage collected instead of here
+    """
+    self._view.release()
+    try:
+      self._mmap.close()
+    except BufferError:
+      # Live records() views still export the map's buffer
+      pass
+
+  def number(self, position: int) -> int:
+    """
+    Returns the puzzle number of the puzzle at a position
+    """
+    if position < 0:
+      position += self._count
+    if position < 0 or position >= self._count:
+      raise IndexError("Packed corpus index out of range")
+    return _u32.unpack_from(self._view, self._numbers_offset + _u32.size * position)[0]
+
+  def position(self, number: int) -> Optional[int]:
+    """
+    Returns the position of a puzzle number in the corpus, or None if the corpus doesn't contain it
+    """
+    position = bisect_left(_U32Sequence(self._view, self._numbers_offset, self._count), number)
+    if position < self._count and self.number(position) == number:
+      return position
+    return None
+
+  def get(self, number: int) -> Optional[KillerSudoku]:
+    """
+    Returns the puzzle with the given puzzle number, or None if the corpus doesn't contain it
+    """
+    position = self.position(number)
+    return None if position is None else self[position]
+
+  def records(self, position: int) -> memoryview:
+    """
+    Returns the cage records of the puzzle at a position as a zero-copy view into the memory map. The view keeps
+    the map alive after close until it is released
+    """
+    if position < 0:
+      position += self._count
+    if position < 0 or position >= self._count:
+      raise IndexError("Packed corpus index out of range")
+    start, end = struct.unpack_from('<II', self._view, self._offsets_offset + _u32.size * position)
+    return self._view[start:end]
+
+  def _build(self, records: memoryview) -> KillerSudoku:
+    cages = []
+    for offset in range(0, len(records), record_size):
+      cage_size = records[offset + 1]
+      cages.append(Cage._from_indices(records[offset], records[offset + 2:offset + 2 + cage_size]))
+    return KillerSudoku(cages)
+
+class _U32Sequence(Sequence):
+  # Read-only sequence over little-endian u32 values in a buffer, used to bisect puzzle numbers in place
+  def __init__(self, view: memoryview, offset: int, length: int):
+    self._view = view
+    self._offset = offset
+    self._length = length
+
+  def __len__(self) -> int:
+    return self._length
+
+  def __getitem__(self, index: int) -> int:
+    return _u32.unpack_from(self._view, self._offset + _u32.size * index)[0]
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  parser = argparse.ArgumentParser(prog='python -m killer_sudoku.corpus', description="Pack puzzles into a packed corpus file")
+  parser.add_argument('source', help="directory of puzzleNNNNN.txt files, or an archive of puzzles")
+  parser.add_argument('destination', help="path of the packed corpus to write")
+  args = parser.parse_args(argv)
+  count = pack_corpus(iter_numbered_puzzles(args.source), args.destination)
+  print(f"Packed {count} puzzles into {args.destination}")
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,198 @@
+from typing import Iterable, List, Union
+from killer_sudoku import geometry
+from killer_sudoku.bitmask import digit_mask
+from killer_sudoku.static_data import cage_sum_combinations
+
+"""
+Exact cover backend solved with Dancing Links (Algorithm X), selected with KillerSudoku.solve(engine="dlx")
+
+Columns, each covered exactly once:
+- cell: every cell holds one digit
+- row-digit, column-digit, subgrid-digit: every house holds each digit once
+- cage: every cage, and every innie or outie virtual cage lying in a house, picks one combination for its sum
+- cage-digit: every digit is either placed in the cage once, or left out by the cage's combination
+Rows:
+- placement of digit d in a cell, covering its cell, house-digit and cage-digit columns
+- combination of a cage, covering the cage column and the cage-digit columns of the digits it leaves out
+A cage's cells can then only hold the digits of its combination, once each, so they add up to the cage sum.
+https://en.wikipedia.org/wiki/Dancing_Links
+"""
+
+# Offsets of each group of columns
+_cell_columns = 0
+_row_digit_columns = 81
+_column_digit_columns = 162
+_subgrid_digit_columns = 243
+_cage_columns = 324
+
+class _DancingLinks:
+  """
+  Sparse 0/1 matrix as circular doubly linked lists, stored in flat lists indexed by node.
+  Node 0 is the root and nodes 1 to num_columns are the column headers
+  """
+  def __init__(self, num_columns: int):
+    headers = num_columns + 1
+    self.left = [headers - 1] + list(range(headers - 1))
+    self.right = list(range(1, headers)) + [0]
+    self.up = list(range(headers))
+    self.down = list(range(headers))
+    self.column = list(range(headers))
+    self.size = [0] * headers
+    # key: node, value: id of the row the node belongs to, -1 for the root and column headers
+    self.row = [-1] * headers
+
+  def add_row(self, row: int, columns: Iterable[int]) -> None:
+    """
+    Appends a row with a 1 in each of the given columns, numbered from 0
+    """
+    left, right, up, down = self.left, self.right, self.up, self.down
+    first = None
+    for c in columns:
+      c += 1
+      node = len(self.column)
+      self.column.append(c)
+      self.row.append(row)
+      up.append(up[c])
+      down.append(c)
+      down[up[c]] = node
+      up[c] = node
+      self.size[c] += 1
+      if first is None:
+        first = node
+        left.append(node)
+        right.append(node)
+      else:
+        left.append(left[first])
+        right.append(first)
+        right[left[first]] = node
+        left[first] = node
+
+  def cover(self, c: int) -> None:
+    left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+    right[left[c]] = right[c]
+    left[right[c]] = left[c]
+    i = down[c]
+    while i != c:
+      j = right[i]
+      while j != i:
+        down[up[j]] = down[j]
+        up[down[j]] = up[j]
+        size[column[j]] -= 1
+        j = right[j]
+      i = down[i]
+
+  def uncover(self, c: int) -> None:
+    left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+    i = up[c]
+    while i != c:
+      j = left[i]
+      while j != i:
+        size[column[j]] += 1
+        down[up[j]] = j
+        up[down[j]] = j
+        j = left[j]
+      i = up[i]
+    right[left[c]] = c
+    left[right[c]] = c
+
+class DlxSolver:
+  def __init__(self, ks: 'KillerSudoku'):
+    """
+    Encodes a puzzle as an exact cover problem
+
+    :param KillerSudoku ks: Puzzle to solve
+    """
+    self.ks = ks
+    # Virtual cages from the 45 rule whose cells share a house are distinct, so they are encoded like cages.
+    # They overlap the cages, which is fine since each one has its own columns
+    cages = list(ks.cages) + [cage for cage in ks._virtual_cages if cage.distinct]
+    cage_digit_columns = _cage_columns + len(cages)
+    self._links = _DancingLinks(cage_digit_columns + 9 * len(cages))
+    # key: row id, value: (cell index, digit) for placement rows, None for combination rows
+    self._placements = []
+
+    cell_cages = [[] for _ in range(81)]
+    for k, cage in enumerate(cages):
+      # A virtual cage of an unsolvable puzzle can have a sum no combination reaches, its cage column then has
+      # no rows and the search fails
+      combos, _ = cage_sum_combinations.get((len(cage.indices), cage.sum), ((), 0))
+      for combo in combos:
+        self._links.add_row(len(self._placements), [_cage_columns + k] + [
+          cage_digit_columns + k * 9 + d for d in range(9) if not combo >> d & 1
+        ])
+        self._placements.append(None)
+      for idx in cage.indices:
+        cell_cages[idx].append(k)
+
+    # Cells only get placements for digits of their cage's combinations, or their set value
+    for cage in ks.cages:
+      _, union_mask = cage_sum_combinations[(len(cage), cage.sum)]
+      for idx in cage.indices:
+        value = ks._board[idx]
+        mask = digit_mask(value) if value else union_mask
+        row, column, subgrid = geometry.cell_houses[idx]
+        for d in range(9):
+          if mask >> d & 1:
+            self._links.add_row(len(self._placements), [
+              _cell_columns + idx,
+              _row_digit_columns + row * 9 + d,
+              _column_digit_columns + (column - 9) * 9 + d,
+              _subgrid_digit_columns + (subgrid - 18) * 9 + d
+            ] + [cage_digit_columns + k * 9 + d for k in cell_cages[idx]])
+            self._placements.append((idx, d + 1))
+
+    # Number of search nodes visited, reported by the benchmark
+    self.nodes = 0
+
+  def solve(self) -> Union[List[List[int]], None]:
+    """
+    Returns the solved 9x9 board, or None if the puzzle has no solution
+    """
+    rows = []
+    if not self._search(rows):
+      return None
+    board = [[0] * 9 for _ in range(9)]
+    for row in rows:
+      placement = self._placements[row]
+      if placement is not None:
+        idx, value = placement
+        board[idx // 9][idx % 9] = value
+    return board
+
+  def _search(self, rows: List[int]) -> bool:
+    # Algorithm X: cover the column with the fewest rows, then try each of its rows
+    self.nodes += 1
+    links = self._links
+    right, down, size = links.right, links.down, links.size
+    if right[0] == 0:
+      return True
+    c = right[0]
+    best = c
+    best_size = size[c]
+    while c != 0 and best_size > 1:
+      if size[c] < best_size:
+        best = c
+        best_size = size[c]
+      c = right[c]
+    if best_size == 0:
+      return False
+
+    column, left = links.column, links.left
+    links.cover(best)
+    i = down[best]
+    while i != best:
+      rows.append(links.row[i])
+      j = right[i]
+      while j != i:
+        links.cover(column[j])
+        j = right[j]
+      if self._search(rows):
+        return True
+      j = left[i]
+      while j != i:
+        links.uncover(column[j])
+        j = left[j]
+      rows.pop()
+      i = down[i]
+    links.uncover(best)
+    return False
@@ -0,0 +1,64 @@
+from typing import Mapping, Tuple
+from killer_sudoku.cage import Cage
+
+"""
+Fixed 9x9 geometry shared by every puzzle, built once at import
+
+Houses are the 9 rows, 9 columns and 9 subgrids, in that order, so house h is row h for h < 9,
+column h - 9 for h < 18 and subgrid h - 18 otherwise. Cells are indexed i * 9 + j.
+"""
+
+def _build_houses() -> Tuple[Tuple[Cage, ...], Tuple[Cage, ...], Tuple[Cage, ...]]:
+  rows = tuple(Cage(45, tuple((i, j) for j in range(9))) for i in range(9))
+  columns = tuple(Cage(45, tuple((i, j) for i in range(9))) for j in range(9))
+  subgrids = tuple(
+    Cage(45, tuple((s // 3 * 3 + k // 3, s % 3 * 3 + k % 3) for k in range(9))) for s in range(9)
+  )
+  return rows, columns, subgrids
+
+# Cages with sum 45 for each row, column and subgrid
+rows, columns, subgrids = _build_houses()
+
+# key: house index
+# value: flat indices of the cells in the house
+house_cells: Tuple[Tuple[int, ...], ...] = tuple(
+  tuple(house.indices) for house in rows + columns + subgrids
+)
+
+# key: flat cell index
+# value: (row, column, subgrid) house indices containing the cell
+cell_houses: Tuple[Tuple[int, int, int], ...] = tuple(
+  (idx // 9, 9 + idx % 9, 18 + idx // 27 * 3 + idx % 9 // 3) for idx in range(81)
+)
+
+def _build_intersections() -> Tuple[Tuple[int, int, Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]], ...]:
+  intersections = []
+  for box in range(18, 27):
+    box_cells = set(house_cells[box])
+    s = box - 18
+    for line in tuple(s // 3 * 3 + k for k in range(3)) + tuple(9 + s % 3 * 3 + k for k in range(3)):
+      line_cells = set(house_cells[line])
+      intersections.append((
+        box,
+        line,
+        tuple(sorted(box_cells & line_cells)),
+        tuple(sorted(box_cells - line_cells)),
+        tuple(sorted(line_cells - box_cells))
+      ))
+  return tuple(intersections)
+
+# Each of the 54 intersections of a subgrid with a row or column as
+# (subgrid house, line house, 3 cells in both, 6 other cells of the subgrid, 6 other cells of the line)
+intersections = _build_intersections()
+
+def _build_house_neighbors() -> Mapping[Tuple[int, int], Mapping[str, Tuple[Tuple[int, int], ...]]]:
+  neighbors = {}
+  for kind, houses in (('row', rows), ('column', columns), ('subgrid', subgrids)):
+    for house in houses:
+      for cell in house.cells:
+        neighbors.setdefault(cell, {})[kind] = tuple(c for c in house.cells if c != cell)
+  return neighbors
+
+# key: (i, j) cell coordinates
+# value: {'row', 'column', 'subgrid'} mapped to the other cells in that house
+house_neighbors = _build_house_neighbors()
@@ -0,0 +1,91 @@
+from typing import Iterable, List, NamedTuple, Tuple
+from killer_sudoku import geometry
+from killer_sudoku.cage import Cage
+
+"""
+Virtual cages from the 45 rule (innies and outies)
+
+Every row, column and subgrid sums to 45, so a region made of k houses sums to 45 * k.
+- innies: the cells of the region not covered by cages that lie entirely inside it, they sum to 45 * k minus the
+  sums of those cages
+- outies: the cells outside the region of cages that overlap it, they sum to the sums of those cages minus 45 * k
+Regions are runs of consecutive rows, runs of consecutive columns, single subgrids and pairs of subgrids in the same
+band or stack. https://www.sudokuwiki.org/Killer_Sudoku
+"""
+
+# Virtual cages with more cells than this prune too little to be worth checking during search
+max_virtual_cage_size = 6
+
+class VirtualCage(NamedTuple):
+  # Sum of the values of the cells
+  sum: int
+  # Flat cell indices
+  indices: bytes
+  # Whether the cells all share a house, so their values must be unique
+  distinct: bool
+
+def _mask(indices: Iterable[int]) -> int:
+  mask = 0
+  for idx in indices:
+    mask |= 1 << idx
+  return mask
+
+def _indices(mask: int) -> bytes:
+  return bytes(idx for idx in range(81) if mask >> idx & 1)
+
+def _build_regions() -> Tuple[Tuple[int, int], ...]:
+  # (81-bit cell mask, number of houses) of every region
+  house_masks = [_mask(cells) for cells in geometry.house_cells]
+  rows, columns, subgrids = house_masks[:9], house_masks[9:18], house_masks[18:]
+  regions = []
+  for lines in (rows, columns):
+    for start in range(9):
+      mask = 0
+      for end in range(start, 9):
+        mask |= lines[end]
+        if end - start < 8:
+          regions.append((mask, end - start + 1))
+  for s in range(9):
+    regions.append((subgrids[s], 1))
+  for s in range(9):
+    for t in range(s + 1, 9):
+      if s // 3 == t // 3 or s % 3 == t % 3:
+        regions.append((subgrids[s] | subgrids[t], 2))
+  return tuple(regions)
+
+# Regions used for the 45 rule, shared by every puzzle
+_regions = _build_regions()
+
+# 81-bit cell masks of the houses, to tell if a virtual cage lies in a single house
+_house_masks = tuple(_mask(cells) for cells in geometry.house_cells)
+
+def virtual_cages(cages: Iterable[Cage]) -> List[VirtualCage]:
+  """
+  Derives the innie and outie virtual cages of a puzzle
+
+  :param Iterable[Cage] cages: Cages of the puzzle, which must cover every cell once
+
+  :return: Virtual cages with at most max_virtual_cage_size cells that aren't already a cage of the puzzle
+  """
+  cage_masks = [(_mask(cage.indices), cage.sum) for cage in cages]
+  existing = {mask for mask, _ in cage_masks}
+  found = {}
+  for region, num_houses in _regions:
+    inside_mask = 0
+    inside_sum = 0
+    touching_mask = 0
+    touching_sum = 0
+    for mask, cage_sum in cage_masks:
+      if mask & region:
+        touching_mask |= mask
+        touching_sum += cage_sum
+        if not mask & ~region:
+          inside_mask |= mask
+          inside_sum += cage_sum
+    for mask, virtual_sum in ((region & ~inside_mask, 45 * num_houses - inside_sum), (touching_mask & ~region, touching_sum - 45 * num_houses)):
+      if mask and mask not in existing and bin(mask).count('1') <= max_virtual_cage_size:
+        found[mask] = virtual_sum
+  return [
+    VirtualCage(virtual_sum, _indices(mask), any(not mask & ~house for house in _house_masks))
+    for mask, virtual_sum in found.items()
+  ]
@@ -1,12 +1,21 @@
 from typing import Iterable, Tuple, Optional, Union, Mapping
-from copy import deepcopy
+from array import array
+from collections import deque
+from itertools import combinations
+from killer_sudoku import geometry
 from killer_sudoku.cage import Cage
+from killer_sudoku.dlx import DlxSolver
+from killer_sudoku.sat import SatSolver
+from killer_sudoku.innies_outies import VirtualCage, virtual_cages
+from killer_sudoku.bitmask import all_digits, digit_mask, digit_sum_table, digits_at_least_table, digits_at_most_table, highest_digit_table, lowest_digit_table, popcount_table
+from killer_sudoku.static_data import cage_sum_combinations
 
 """
 KillerSudoku(board, cages, raising=False)
 - board: 9x9 array with numbers for set cells and 0 for unset cells
 - cages: list of 
 - solve(): returns a solved killer sudoku
+- count_solutions(limit=2): returns the number of solutions, stopping at limit
 - show(): prints the killer sudoku
 """
 
@@ -24,7 +33,21 @@ Strategy:
 class UnsolvableError(Exception):
   pass
 
+class _Contradiction(Exception):
+  """
+  Raised by the solver when a reduction leaves the board in an impossible state
+  """
+  pass
+
 class KillerSudoku:
+  # The board is an 81-byte buffer indexed by i*9+j and the cages are a shared tuple,
+  # so a puzzle takes a few hundred bytes plus its cages
+  __slots__ = ('_board', 'cages', '_neighbors_cache', '_virtual_cages_cache')
+
+  # Rows, columns and subgrids are the same for every puzzle and shared from geometry
+  _rows: Iterable[Cage] = geometry.rows
+  _columns: Iterable[Cage] = geometry.columns
+  _subgrids: Iterable[Cage] = geometry.subgrids
 
   def __init__(self, cages: Iterable[Cage], board: Optional[Iterable[Iterable[int]]] = [[0 for _ in range(0,9)] for _ in range(0,9)]):
     """
@@ -33,7 +56,8 @@ class KillerSudoku:
     :param Iterable[Cage] cages: Iterable for the cages for the Killer Sudoku board
     :param Iterable[Iterable[int]] board: 9x9 list for the initial state of the Killer Sudoku board, defaults to a 9x9 list of 0s
     
-    :raises ValueError: If the board size isn't 9x9, if cells are counted in multiple cages, or if cages don't include all 81 cells
+    :raises ValueError: If the board size isn't 9x9, if a board value isn't in the range [0-9], if cells are counted
+      in multiple cages, or if cages don't include all 81 cells
     """
     
     # Check board size
@@ -44,59 +68,90 @@ class KillerSudoku:
         raise ValueError("Board must be 9x9")
     
     # Check that cells are unique to a single cage, and that cages encompass all 81 cells
-    unique_cells = set()
+    cages = tuple(cages)
+    seen = bytearray(81)
+    num_cells = 0
     for cage in cages:
-      for cell in cage.cells:
-        if cell in unique_cells:
-          raise ValueError(f"Cell {cell} has been included in multiple cages. A cell can only exist in 1 cage")
-        else:
-          unique_cells.add(cell)
-    if len(unique_cells) != 81:
+      for idx in cage.indices:
+        if seen[idx]:
+          raise ValueError(f"Cell {divmod(idx, 9)} has been included in multiple cages. A cell can only exist in 1 cage")
+        seen[idx] = 1
+      num_cells += len(cage)
+    if num_cells != 81:
       raise ValueError("Cages do not contain all 81 cells in the puzzle")
     
-    # TODO: Check that board has values appropriately assigned
+    # TODO: Check that board values don't conflict with each other or the cages
+    values = [value for row in board for value in row]
+    for value in values:
+      if value < 0 or value > 9:
+        raise ValueError(f"Board value {value} is out of bounds. Values must be in the range [0-9]")
     
-    self.board: Iterable[Iterable[int]] = deepcopy(board)
-    self.cages: Iterable[Cage] = deepcopy(cages)
-    self._rows: Iterable[Cage] = []
-    self._columns: Iterable[Cage] = []
-    self._subgrids: Iterable[Cage] = []
-
-    # Add cages for rows
-    for i in range(0,9):
-      row = []
-      for j in range(0,9):
-        row.append((i,j))
-      self._rows.append(Cage(45, row))
+    # Cages are never modified after construction so they are shared
+    self._board = bytearray(values)
+    self.cages: Iterable[Cage] = cages
+    self._neighbors_cache = None
+    self._virtual_cages_cache = None
 
-    # Add cages for columns
-    for j in range(0,9):
-      column = []
-      for i in range(0,9):
-        column.append((i,j))
-      self._columns.append(Cage(45, column))
-
-    # Add cages for subgrids
-    subgrids = [[None for _ in range(9)] for _ in range(9)]
-    for i in range(9):
-        for j in range(9):
-            subgrid_index = (i // 3) * 3 + (j // 3)
-            subgrids[subgrid_index][i % 3 * 3 + j % 3] = (i, j)
-    for subgrid in subgrids:
-      self._subgrids.append(Cage(45, subgrid))
-    
-    self._neighbors_map = self._get_neighbors_map()
+  @property
+  def board(self) -> Iterable[Iterable[int]]:
+    """
+    9x9 list of the board values, with 0 for unset cells
+    """
+    return [list(self._board[i*9:i*9+9]) for i in range(9)]
+
+  def solve(self, raising: Optional[bool] = False, cache: Optional['SolutionCache'] = None, engine: str = 'propagation', max_subset_size: int = 2) -> Union['KillerSudoku', None]:
+    """
+    Solves the Killer Sudoku
 
+    :param bool raising: Raise an UnsolvableError instead of returning None if there is no solution
+    :param SolutionCache cache: Cache of solutions to answer from without solving, and to store the solution in
+    :param str engine: Solving backend, one of the keys of engines: 'propagation' for constraint propagation with
+      backtracking, 'dlx' for exact cover with Dancing Links, 'sat' for clause learning on a CNF encoding
+    :param int max_subset_size: Largest naked and hidden subsets searched for by the 'propagation' engine, in the
+      range [0, 4]. Below 2 disables them. Ignored by the other engines
 
-  def solve(self, raising: Optional[bool] = False) -> Union['KillerSudoku', None]:
-    solution = _Solver(self).solve()
+    :return: A new KillerSudoku with the same cages and a fully filled board, or None if there is no solution
+    :raises UnsolvableError: If raising is set and there is no solution
+    :raises ValueError: If the engine is unknown
+    """
+    if engine not in engines:
+      raise ValueError(f"Unknown engine {engine}, must be one of {', '.join(engines)}")
+    if cache is not None:
+      key = cache.key(self)
+      hit, solution = cache.lookup(self, key)
+      if not hit:
+        solution = self._engine_solver(engine, max_subset_size).solve()
+        cache.store(self, solution, key)
+    else:
+      solution = self._engine_solver(engine, max_subset_size).solve()
     if solution:
-      return solution
+      return KillerSudoku(self.cages, solution)
     elif raising:
-      return UnsolvableError("No solution found")
+      raise UnsolvableError("No solution found")
     else:
       return None
 
+  def count_solutions(self, limit: int = 2, max_subset_size: int = 2) -> int:
+    """
+    Counts the solutions of the Killer Sudoku, stopping as soon as limit solutions are found.
+    With the default limit of 2, a result of 1 means the solution is unique
+
+    :param int limit: Maximum number of solutions to count
+    :param int max_subset_size: Largest naked and hidden subsets searched for, in the range [0, 4]. Below 2 disables them
+
+    :return: Number of solutions found, at most limit
+    :raises ValueError: If limit is less than 1
+    """
+    if limit < 1:
+      raise ValueError("Limit must be at least 1")
+    return _Solver(self, max_subset_size=max_subset_size).count_solutions(limit)
+
+  def _engine_solver(self, engine: str, max_subset_size: int):
+    # Only the propagation solver searches for subsets, the other engines take the puzzle alone
+    if engine == 'propagation':
+      return _Solver(self, max_subset_size=max_subset_size)
+    return engines[engine](self)
+
   def show(self) -> None:
     # Top line
     sep_line = "╔"
@@ -131,7 +186,7 @@ class KillerSudoku:
       cell_line = "║"
       sep_line = "║" if (i+1, 0) in self._neighbors_map[(i,0)]['cage'] else "╠"
       for j in range(0,9):
-        value = ' ' if self.board[i][j] == 0 else self.board[i][j]
+        value = ' ' if self._board[i*9+j] == 0 else self._board[i*9+j]
         neighbors = self._neighbors_map[(i,j)]['cage']
         cell_line += f' {value} '
         sep_line += "   " if (i+1, j) in neighbors else "═══"
@@ -152,134 +207,647 @@ class KillerSudoku:
     # Last row
     cell_line = "║"
     sep_line = "╚"
-    for j in range(0,8):
-      neighbors = self._neighbors_map[(8,j)]['cage']
+    for j in range(0,9):
+      value = ' ' if self._board[72+j] == 0 else self._board[72+j]
       cell_line += f' {value} '
+      if j == 8:
+        break
+      neighbors = self._neighbors_map[(8,j)]['cage']
       cell_line += " " if (8, j+1) in neighbors else "║"
       sep_line += "═══"
       sep_line += "═" if (8, j+1) in self._neighbors_map[(8,j)]['cage'] else "╩"
-    cell_line += f' {value} ║'
+    cell_line += "║"
     sep_line += "═══╝"
     print(cell_line)
     print(sep_line)
 
-  def _get_neighbors_map(self) -> Mapping[Tuple, Iterable]:
+  @property
+  def _neighbors_map(self) -> Mapping[Tuple, Iterable]:
+    # Built on first use since only show() needs it.
+    # Row, column and subgrid neighbors are shared, only cage neighbors depend on the puzzle
+    if self._neighbors_cache is not None:
+      return self._neighbors_cache
     neighbors_map = {}
-    for i in range(9):
-      for j in range(9):
-        neighbors_map[(i,j)] = {}
-    for row in self._rows:
-      for cell in row.cells:
-        neighbors_map[cell]['row'] = [c for c in row.cells if c != cell]
-    for column in self._columns:
-      for cell in column.cells:
-        neighbors_map[cell]['column'] = [c for c in column.cells if c != cell]
-    for subgrid in self._subgrids:
-      for cell in subgrid.cells:
-        neighbors_map[cell]['subgrid'] = [c for c in subgrid.cells if c != cell]
     for cage in self.cages:
       for cell in cage.cells:
+        neighbors_map[cell] = dict(geometry.house_neighbors[cell])
         neighbors_map[cell]['cage'] = [c for c in cage.cells if c != cell]
+    self._neighbors_cache = neighbors_map
     return neighbors_map
 
+  @property
+  def _virtual_cages(self) -> Iterable[VirtualCage]:
+    # Innie and outie cages from the 45 rule, derived once per puzzle on first use
+    if self._virtual_cages_cache is None:
+      self._virtual_cages_cache = tuple(virtual_cages(self.cages))
+    return self._virtual_cages_cache
+
+class _Trail:
+  """
+  Undo log for the solver's search state. Every change made through the trail records the previous value,
+  so backtracking restores the state at a mark without copying anything. The log only holds the changes
+  made along the current search path, so its size is proportional to the search depth
+  """
+  def __init__(self):
+    self._entries = []
+
+  def mark(self) -> int:
+    """
+    Returns a mark for the current state that can later be passed to undo
+    """
+    return len(self._entries)
+
+  def set(self, container, key, value) -> None:
+    """
+    Sets container[key] to value, recording the previous value
+    """
+    self._entries.append((container, key, container[key]))
+    container[key] = value
+
+  def undo(self, mark: int) -> None:
+    """
+    Reverts every change recorded since the given mark, most recent first
+    """
+    entries = self._entries
+    while len(entries) > mark:
+      container, key, value = entries.pop()
+      container[key] = value
+
 class _Solver:
-  def __init__(self, ks: KillerSudoku):
+  def __init__(self, ks: KillerSudoku, candidates: Optional[Iterable[int]] = None, max_subset_size: int = 2):
+    """
+    :param KillerSudoku ks: Puzzle to solve
+    :param Iterable[int] candidates: 81 candidate masks to start from, e.g. after a presolve. Defaults to domain 1-9
+    :param int max_subset_size: Largest naked and hidden subsets searched for, in the range [0, 4]. Below 2 disables them
+    """
     self.ks = ks
-    # Initialize empty cells to have domain 1-9
-    self.empty_cell_possibilities = dict()
-    for i in range(9):
-      for j in range(9):
-        if self.ks.board[i][j] == 0:
-          self.empty_cell_possibilities[(i,j)] = {1,2,3,4,5,6,7,8,9}
-    
+    # Candidates for every cell as a 9-bit mask in a flat array indexed by i*9+j.
+    # Set cells have a single candidate, empty cells start with domain 1-9
+    self.candidates = array('H', [all_digits] * 81 if candidates is None else candidates)
+    for idx, value in enumerate(self.ks._board):
+      if value != 0:
+        self.candidates[idx] &= digit_mask(value)
+    # Cells in a cage can only hold digits from a valid combination for the cage sum
+    for cage in self.ks.cages:
+      _, union_mask = cage_sum_combinations[(len(cage), cage.sum)]
+      for idx in cage.indices:
+        self.candidates[idx] &= union_mask
+
+    # Every constraint is a unit of flat cell indices with a required sum, and unique values if it is distinct.
+    # The 27 shared rows, columns and subgrids come first, followed by the cages, then the innie and outie
+    # virtual cages. cell_units maps each cell to the units it belongs to
+    self._num_houses = len(geometry.house_cells)
+    self._units = list(geometry.house_cells)
+    self._unit_sums = [45] * self._num_houses
+    self._unit_distinct = [True] * self._num_houses
+    self._cell_units = [list(houses) for houses in geometry.cell_houses]
+    for cage in self.ks.cages + self.ks._virtual_cages:
+      unit = len(self._units)
+      self._units.append(tuple(cage.indices))
+      self._unit_sums.append(cage.sum)
+      self._unit_distinct.append(getattr(cage, 'distinct', True))
+      for idx in self._units[unit]:
+        self._cell_units[idx].append(unit)
+
+    # Per-unit, per-digit count of the cells that still have the digit as a candidate, at unit*9 + digit-1.
+    # Only counted for rows, columns, subgrids and 9-cell cages, where every digit must appear once.
+    # Counts reaching 1 or 0 are queued for the hidden singles reduce
+    self._digit_counts = array('B', bytes(9 * len(self._units)))
+    self._hidden_singles = []
+    self._cell_counted_units = [[] for _ in range(81)]
+    for unit, cells in enumerate(self._units):
+      if len(cells) == 9 and self._unit_distinct[unit]:
+        for idx in cells:
+          self._cell_counted_units[idx].append(unit)
+          mask = self.candidates[idx]
+          for d in range(9):
+            if mask >> d & 1:
+              self._digit_counts[unit*9+d] += 1
+        for d in range(9):
+          if self._digit_counts[unit*9+d] <= 1:
+            self._hidden_singles.append(unit*9+d)
+
+    # Worklist of units whose cells changed since they were last checked. Every unit starts dirty
+    self._dirty_units = deque(range(len(self._units)))
+    self._queued = [True] * len(self._units)
+
+    # Largest subset size each unit was checked for by the naked and hidden subsets reduce since its cells last
+    # changed, 0 if it's dirty. Only distinct units with more cells than the smallest subset can hold a subset.
+    # Hidden subsets need every digit to appear in the unit, so they are only searched in 9-cell units.
+    # Search only branches once no reduce makes progress, so backtracking always returns to a state where every
+    # unit was checked, and the flags are reset to all clean instead of going through the trail
+    self.max_subset_size = min(max_subset_size, 4)
+    self._subset_clean = array('B', bytes(len(self._units)))
+    self._subset_all_clean = array('B', [max(self.max_subset_size, 0)] * len(self._units))
+    self._subset_units = [unit for unit, cells in enumerate(self._units) if self._unit_distinct[unit] and len(cells) > 2]
+
+    # Whether each unit changed since the intersection removal last ran. Reset to all clean on backtracking
+    # for the same reason as the subset flags
+    self._all_clean = bytes(len(self._units))
+    self._intersection_dirty = bytearray(b'\x01' * len(self._units))
+    # (cage unit, cells outside the cage) for every house that contains a whole cage or distinct virtual cage
+    self._cage_house_rests = []
+    for unit in range(self._num_houses, len(self._units)):
+      if not self._unit_distinct[unit]:
+        continue
+      cage_cells = set(self._units[unit])
+      for cells in geometry.house_cells:
+        if cage_cells < set(cells):
+          self._cage_house_rests.append((unit, tuple(idx for idx in cells if idx not in cage_cells)))
+
+    # Combinations of digits each distinct cage can still hold, as a bitmask over the indices of its entry in
+    # cage_sum_combinations. Combinations only ever die along a search path, so the masks change through the trail.
+    # Like the other flags, combo_dirty is reset to all clean on backtracking
+    self._cage_combos = [()] * len(self._units)
+    self._live_combos = [0] * len(self._units)
+    self._combo_units = []
+    for unit in range(self._num_houses, len(self._units)):
+      key = (len(self._units[unit]), self._unit_sums[unit])
+      if self._unit_distinct[unit] and key in cage_sum_combinations:
+        self._cage_combos[unit] = cage_sum_combinations[key][0]
+        self._live_combos[unit] = (1 << len(self._cage_combos[unit])) - 1
+        self._combo_units.append(unit)
+    self._combo_dirty = bytearray(b'\x01' * len(self._units))
+
+    # key: kind and size of subset, e.g. naked_2 for naked pairs, value: number of candidates it eliminated
+    self.subset_eliminations = {f'{kind}_{size}': 0 for size in range(2, 5) for kind in ('naked', 'hidden')}
+
+    # Every candidate removal or assignment goes through the trail so backtracking can undo it
+    self._trail = _Trail()
+
+    # Number of search nodes visited, reported by the benchmark
+    self.nodes = 0
+    # Number of solutions found, the search stops at the limit'th one and returns it
+    self.solutions = 0
+    self._solution_limit = 1
+
   def solve(self) -> Union[Iterable[Iterable[int]], None]:
-    # Decide which possibility reduction strategies to use here
-    # TODO: easy killer combo reduce
-    # TODO: hard killer combo reduce
-    # TODO: constraint reduce
-    # TODO: single innies and outies reduce
-    return #self._recursive_solve(self.board, self.empty_cell_possibilities)
+    board = self.ks.board
+    return self._recursive_solve(board, self.candidates)
+
+  def count_solutions(self, limit: int) -> int:
+    """
+    Runs the same search as solve, but treats the first limit - 1 solutions as dead ends so the search goes on
+    """
+    self._solution_limit = limit
+    self._recursive_solve(self.ks.board, self.candidates)
+    return self.solutions
     
-  def _recursive_solve(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int], Iterable]) -> Union[Iterable[Iterable[int]], None]:
-    while len(empty_cell_possibilities) > 0:
-      if self._impossible(board):
+  def _recursive_solve(self, board: Iterable[Iterable[int]], candidates: array) -> Union[Iterable[Iterable[int]], None]:
+    self.nodes += 1
+    # Apply strategies to reduce empty cell possibilities until none of them make progress
+    # TODO: Consider adding more strategies if you can
+    try:
+      while True:
+        if self._constraint_reduce(board, candidates):
+          continue
+        if self._last_remaining_reduce(board, candidates):
+          continue
+        if self._conjugate_pair_reduce(board, candidates): # Naked & hidden pairs
+          continue
+        if self._conjugate_triple_reduce(board, candidates): # Naked & hidden triples
+          continue
+        if self._pointing_pair_reduce(board, candidates):
+          continue
+        if self._hard_killer_combo_reduce(board, candidates):
+          continue
+        break
+    except _Contradiction:
+      return None
+
+    idx = self._most_constrained_cell(candidates)
+    if idx is None:
+      self.solutions += 1
+      if self.solutions < self._solution_limit:
         return None
-      self._fill_board(board, empty_cell_possibilities)
-      # Apply strategies to reduce empty cell possibilities
-      # TODO: Consider adding more strategies if you can
-      # Maybe use a flag system to skip unnecessary strategies
-      if self._constraint_reduce(board, empty_cell_possibilities):
-        continue
-      if self._last_remaining_reduce():
-        continue
-      if self._conjugate_pair_reduce(): # Naked & hidden pairs
-        continue
-      if self._conjugate_triple_reduce(): # Naked & hidden triples
-        continue
-      if self._pointing_pair_reduce():
+      self._fill_board(board, candidates)
+      return board
+
+    # Apply backtrack if strategies couldn't reduce empty cell possibilities.
+    # Try each candidate of the most constrained cell, undoing its changes through the trail on failure
+    remaining = candidates[idx]
+    while remaining:
+      value = remaining & -remaining
+      remaining ^= value
+      mark = self._trail.mark()
+      try:
+        self._set_candidates(idx, value)
+        solution = self._recursive_solve(board, candidates)
+        if solution:
+          return solution
+      except _Contradiction:
+        pass
+      self._backtrack(mark)
+    return None
+
+  def _most_constrained_cell(self, candidates: array) -> Optional[int]:
+    """
+    Returns the unset cell with the fewest candidates (minimum remaining values), or None if every cell is set
+    """
+    best_idx = None
+    best_count = 10
+    for idx in range(81):
+      count = popcount_table[candidates[idx]]
+      if 1 < count < best_count:
+        best_idx = idx
+        best_count = count
+        if count == 2:
+          break
+    return best_idx
+
+  def _fill_board(self, board: Iterable[Iterable[int]], candidates: array) -> None:
+    for idx, mask in enumerate(candidates):
+      if popcount_table[mask] == 1 and board[idx // 9][idx % 9] == 0:
+        board[idx // 9][idx % 9] = lowest_digit_table[mask]
+
+  def _backtrack(self, mark: int) -> None:
+    """
+    Restores the search state to the given trail mark, empties the worklists and marks every unit clean for the
+    subsets, intersection and combinations reduces
+    """
+    self._trail.undo(mark)
+    while self._dirty_units:
+      self._queued[self._dirty_units.pop()] = False
+    self._hidden_singles.clear()
+    self._subset_clean[:] = self._subset_all_clean
+    self._intersection_dirty[:] = self._all_clean
+    self._combo_dirty[:] = self._all_clean
+
+  def _set_candidates(self, idx: int, mask: int) -> None:
+    """
+    Narrows the candidates of a cell, marks every unit containing the cell as dirty for the constraint, subsets,
+    intersection and combinations reduces and updates the digit counts
+
+    :raises _Contradiction: If the cell is left without any candidates
+    """
+    if mask == 0:
+      raise _Contradiction()
+    trail = self._trail
+    removed = self.candidates[idx] & ~mask
+    trail.set(self.candidates, idx, mask)
+    counts = self._digit_counts
+    for unit in self._cell_counted_units[idx]:
+      remaining = removed
+      while remaining:
+        value = remaining & -remaining
+        remaining ^= value
+        key = unit*9 + lowest_digit_table[value] - 1
+        count = counts[key] - 1
+        trail.set(counts, key, count)
+        if count <= 1:
+          self._hidden_singles.append(key)
+    queued = self._queued
+    subset_clean = self._subset_clean
+    intersection_dirty = self._intersection_dirty
+    combo_dirty = self._combo_dirty
+    for unit in self._cell_units[idx]:
+      subset_clean[unit] = 0
+      intersection_dirty[unit] = 1
+      combo_dirty[unit] = 1
+      if not queued[unit]:
+        queued[unit] = True
+        self._dirty_units.append(unit)
+
+  def _constraint_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
+    """
+    Enforce the killer suduko constraints on the given board. Reduce empty cell possibilities. 
+    Only units that are on the dirty worklist are checked, and a unit is only added back to the
+    worklist when one of its cells changes, so the reduce runs until no more changes propagate.
+
+    :raises _Contradiction: If a unit has repeated values, a cell has no candidates, or a cage sum can't be met
+    """
+    changed = False
+    dirty_units = self._dirty_units
+    queued = self._queued
+    while dirty_units:
+      unit = dirty_units.popleft()
+      queued[unit] = False
+      cells = self._units[unit]
+
+      if not self._unit_distinct[unit]:
+        changed |= self._sum_bounds_reduce(candidates, cells, self._unit_sums[unit])
         continue
-      if self._hard_killer_combo_reduce():
+
+      # Collect the values of set cells in the unit, they must be unique
+      set_values = 0
+      num_set = 0
+      for idx in cells:
+        mask = candidates[idx]
+        if mask & (mask - 1) == 0:
+          if mask & set_values or mask == 0:
+            raise _Contradiction()
+          set_values |= mask
+          num_set += 1
+
+      # The sum of set values can't exceed the unit sum, and must match it once every cell is set
+      set_sum = digit_sum_table[set_values]
+      if set_sum > self._unit_sums[unit] or (num_set == len(cells) and set_sum != self._unit_sums[unit]):
+        raise _Contradiction()
+
+      if num_set == len(cells):
         continue
 
-      # Apply backtrack if strategies couldn't reduce empty cell possibilities
-      
+      # The unset cells of a cage must hold one of the combinations that make up the rest of the cage sum
+      # without reusing a set value (easy killer combo reduce). Other units only remove set values
+      allowed = all_digits & ~set_values
+      if unit >= self._num_houses:
+        combos, _ = cage_sum_combinations.get((len(cells) - num_set, self._unit_sums[unit] - set_sum), ((), 0))
+        allowed = 0
+        for combo in combos:
+          if not combo & set_values:
+            allowed |= combo
 
-    return board
+      for idx in cells:
+        mask = candidates[idx]
+        if mask & (mask - 1) and mask & ~allowed:
+          self._set_candidates(idx, mask & allowed)
+          changed = True
 
-  def _fill_board(board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> None:
-    set_cells = []
-    for blank_cell, possibilities in empty_cell_possibilities:
-      if len(possibilities) == 1:
-        value_to_set = possibilities.pop()
-        board[blank_cell[0]][blank_cell[1]] = value_to_set
-        set_cells.append(blank_cell)
-    for set_cell in set_cells:
-      empty_cell_possibilities.pop(set_cell)
+      # Every cell of a cage must also reach the residual sum given the smallest and largest candidates of the
+      # other unset cells
+      if unit >= self._num_houses and len(cells) - num_set > 1:
+        changed |= self._sum_bounds_reduce(candidates, cells, self._unit_sums[unit])
 
-  def _impossible(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
-    return False
+    return changed
   
-  def _constraint_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+  def _sum_bounds_reduce(self, candidates: array, cells: Iterable[int], unit_sum: int) -> bool:
     """
-    Enforce the killer suduko constraints on the given board. Reduce empty cell possibilities. 
-    TODO - Think of more efficient way to do this reduce as it will be the most frequently run
-    maybe? keep track of already filled cells in a separate list
+    Remove candidates that can't reach the unit sum given the smallest and largest candidates of the other cells.
+    Set cells count with their value, so this is the residual sum over the unset cells. It's the only sum check
+    for units whose values may repeat, and runs after the combinations check for cages
+
+    :raises _Contradiction: If the unit sum is out of reach
     """
-    for constraint_list in (self.ks.cages, self.ks._rows, self.ks._columns, self.ks._subgrids):
-      for constraint in constraint_list:
-        pass
-    
-    return False
-  
-  def _last_remaining_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+    changed = False
+    min_sum = 0
+    max_sum = 0
+    for idx in cells:
+      min_sum += lowest_digit_table[candidates[idx]]
+      max_sum += highest_digit_table[candidates[idx]]
+    if min_sum > unit_sum or max_sum < unit_sum:
+      raise _Contradiction()
+    for idx in cells:
+      mask = candidates[idx]
+      low = unit_sum - (max_sum - highest_digit_table[mask])
+      high = unit_sum - (min_sum - lowest_digit_table[mask])
+      allowed = digits_at_least_table[max(low, 0)] & digits_at_most_table[min(high, 10)]
+      if mask & ~allowed:
+        self._set_candidates(idx, mask & allowed)
+        changed = True
+    return changed
+
+  def _last_remaining_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
     """
     If a particular value is only possible in one cell in a given row, col, or subgrid. Update the possibility to the last remaining value
     https://www.sudokuwiki.org/Getting_Started
+    Digit counts are maintained by _set_candidates, so only the (unit, digit) pairs whose count dropped to 1 are checked.
+
+    :raises _Contradiction: If a value has no possible cell left in a unit
     """
-    return False
+    changed = False
+    counts = self._digit_counts
+    while self._hidden_singles:
+      key = self._hidden_singles.pop()
+      if counts[key] == 0:
+        raise _Contradiction()
+      unit, d = divmod(key, 9)
+      value = 1 << d
+      for idx in self._units[unit]:
+        mask = candidates[idx]
+        if mask & value:
+          if mask != value:
+            self._set_candidates(idx, value)
+            changed = True
+          break
+    return changed
 
-  def _conjugate_pair_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+  def _conjugate_pair_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
     """
     https://www.sudokuwiki.org/Naked_Candidates
     https://www.sudokuwiki.org/Hidden_Candidates
     """
-    return False
+    if self.max_subset_size < 2:
+      return False
+    return self._subset_reduce(candidates, 2, 2)
   
-  def _conjugate_triple_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+  def _conjugate_triple_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
     """
     https://www.sudokuwiki.org/Naked_Candidates
     https://www.sudokuwiki.org/Hidden_Candidates
+    Also searches for quads when max_subset_size is 4.
     """
+    if self.max_subset_size < 3:
+      return False
+    return self._subset_reduce(candidates, 3, self.max_subset_size)
+
+  def _subset_reduce(self, candidates: array, min_size: int, max_size: int) -> bool:
+    """
+    Search the units that changed since they were last checked for naked and hidden subsets of min_size to max_size.
+    - naked subset: k cells whose candidates together are k digits, the digits can be removed from the other cells
+    - hidden subset: k digits only possible in k cells of a 9-cell unit, the other digits can be removed from those cells
+    Only the cells with at most k candidates and the digits in at most k cells are combined, which is usually few.
+
+    :raises _Contradiction: If an elimination leaves a cell without candidates
+    """
+    subset_clean = self._subset_clean
+    for unit in self._subset_units:
+      level = subset_clean[unit]
+      if level >= max_size:
+        continue
+      # Marked clean before searching, so eliminations in the unit itself mark it dirty again
+      subset_clean[unit] = max_size
+      cells = self._units[unit]
+      unset = [idx for idx in cells if popcount_table[candidates[idx]] > 1]
+      for size in range(max(level + 1, min_size), max_size + 1):
+        if len(unset) <= size:
+          break
+        # Stop at the first change, other units are only valid to search once set values have propagated
+        if self._naked_subset_reduce(candidates, unset, size):
+          return True
+        if len(cells) == 9 and self._hidden_subset_reduce(candidates, unit, size):
+          return True
     return False
-  
-  def _pointing_pair_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+
+  def _naked_subset_reduce(self, candidates: array, unset: Iterable[int], size: int) -> bool:
+    # Only cells with at most size candidates can be part of a naked subset of that size
+    small = [idx for idx in unset if popcount_table[candidates[idx]] <= size]
+    for subset in combinations(small, size):
+      digits = 0
+      for idx in subset:
+        digits |= candidates[idx]
+      if popcount_table[digits] != size:
+        continue
+      changed = False
+      for idx in unset:
+        mask = candidates[idx]
+        if mask & digits and idx not in subset:
+          self._set_candidates(idx, mask & ~digits)
+          self.subset_eliminations[f'naked_{size}'] += popcount_table[mask & digits]
+          changed = True
+      if changed:
+        return True
+    return False
+
+  def _hidden_subset_reduce(self, candidates: array, unit: int, size: int) -> bool:
+    # Only digits in at most size cells can be part of a hidden subset, which the digit counts tell without
+    # looking at the cells. Digits in 1 cell are left to hidden singles
+    counts = self._digit_counts
+    eligible = [d for d in range(9) if 2 <= counts[unit*9 + d] <= size]
+    if len(eligible) < size:
+      return False
+    cells = self._units[unit]
+    # Bitmask of the positions in the unit of the cells that still have each eligible digit
+    positions = [0] * 9
+    for d in eligible:
+      value = 1 << d
+      for p, idx in enumerate(cells):
+        if candidates[idx] & value:
+          positions[d] |= 1 << p
+    for subset in combinations(eligible, size):
+      subset_cells = 0
+      digits = 0
+      for d in subset:
+        subset_cells |= positions[d]
+        digits |= 1 << d
+      if popcount_table[subset_cells] != size:
+        continue
+      changed = False
+      for p, idx in enumerate(cells):
+        mask = candidates[idx]
+        if subset_cells >> p & 1 and mask & ~digits:
+          self._set_candidates(idx, mask & digits)
+          self.subset_eliminations[f'hidden_{size}'] += popcount_table[mask & ~digits]
+          changed = True
+      if changed:
+        return True
+    return False
+
+  def _pointing_pair_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
     """
     https://www.sudokuwiki.org/Intersection_Removal
+    For each intersection of a subgrid and a line where either house changed since the last run:
+    - pointing: digits of the intersection that the rest of the subgrid lacks are removed from the rest of the line
+    - box/line reduction: digits of the intersection that the rest of the line lacks are removed from the rest of the subgrid
+    A cage lying in a house works the same way, the digits in every combination left for the cage are removed
+    from the rest of the house.
+
+    :raises _Contradiction: If a cage has no combination left or a cell is left without candidates
     """
-    return False
+    changed = False
+    dirty = self._intersection_dirty
+    active = bytes(dirty)
+    dirty[:] = self._all_clean
+
+    for box, line, triple, box_rest, line_rest in geometry.intersections:
+      if not (active[box] or active[line]):
+        continue
+      triple_digits = candidates[triple[0]] | candidates[triple[1]] | candidates[triple[2]]
+      box_digits = 0
+      for idx in box_rest:
+        box_digits |= candidates[idx]
+      line_digits = 0
+      for idx in line_rest:
+        line_digits |= candidates[idx]
+      for rest, digits in ((line_rest, triple_digits & ~box_digits & line_digits), (box_rest, triple_digits & ~line_digits & box_digits)):
+        if digits:
+          changed |= self._remove_digits(candidates, rest, digits)
+
+    for unit, rest in self._cage_house_rests:
+      if active[unit]:
+        digits = self._required_cage_digits(candidates, unit)
+        if digits:
+          changed |= self._remove_digits(candidates, rest, digits)
+    return changed
+
+  def _required_cage_digits(self, candidates: array, unit: int) -> int:
+    """
+    Returns the unset digits that are in every combination the unset cells of a distinct cage can still hold
+
+    :raises _Contradiction: If no combination fits the candidates of the cage
+    """
+    cells = self._units[unit]
+    set_values = 0
+    unset_digits = 0
+    num_unset = 0
+    for idx in cells:
+      mask = candidates[idx]
+      if mask & (mask - 1):
+        unset_digits |= mask
+        num_unset += 1
+      else:
+        set_values |= mask
+    if num_unset == 0:
+      return 0
+    combos, _ = cage_sum_combinations.get((num_unset, self._unit_sums[unit] - digit_sum_table[set_values]), ((), 0))
+    required = all_digits
+    found = False
+    for combo in combos:
+      if not combo & ~unset_digits:
+        required &= combo
+        found = True
+    if not found:
+      raise _Contradiction()
+    return required
+
+  def _remove_digits(self, candidates: array, cells: Iterable[int], digits: int) -> bool:
+    changed = False
+    for idx in cells:
+      mask = candidates[idx]
+      if mask & digits:
+        self._set_candidates(idx, mask & ~digits)
+        changed = True
+    return changed
   
-  def _hard_killer_combo_reduce(self, board: Iterable[Iterable[int]], empty_cell_possibilities: Mapping[Tuple[int, int],Iterable[int]]) -> bool:
+  def _hard_killer_combo_reduce(self, board: Iterable[Iterable[int]], candidates: array) -> bool:
     """
     https://www.sudokuwiki.org/Killer_Combinations
+    For each cage that changed since the last run, drop the live combinations that lack a set value of the cage,
+    hold a digit no cell of the cage can take, or have no digit for one of its cells. Each cell is then restricted
+    to the union of the surviving combinations.
+
+    :raises _Contradiction: If a cage has no combination left
     """
-    return False
\ No newline at end of file
+    changed = False
+    dirty = self._combo_dirty
+    for unit in self._combo_units:
+      if not dirty[unit]:
+        continue
+      dirty[unit] = 0
+      cells = self._units[unit]
+      set_values = 0
+      union = 0
+      for idx in cells:
+        mask = candidates[idx]
+        union |= mask
+        if not mask & (mask - 1):
+          set_values |= mask
+
+      live = self._live_combos[unit]
+      remaining = live
+      allowed = 0
+      for i, combo in enumerate(self._cage_combos[unit]):
+        if not live >> i & 1:
+          continue
+        if set_values & ~combo or combo & ~union or not all(candidates[idx] & combo for idx in cells):
+          remaining ^= 1 << i
+        else:
+          allowed |= combo
+      if remaining == 0:
+        raise _Contradiction()
+      if remaining != live:
+        self._trail.set(self._live_combos, unit, remaining)
+
+      for idx in cells:
+        mask = candidates[idx]
+        if mask & ~allowed:
+          self._set_candidates(idx, mask & allowed)
+          changed = True
+    return changed
+
+# key: engine name accepted by KillerSudoku.solve
+# value: solver class, built from a puzzle, whose solve() returns the solved 9x9 board or None
+engines = {
+  'propagation': _Solver,
+  'dlx': DlxSolver,
+  'sat': SatSolver
+}
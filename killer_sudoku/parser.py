@@ -0,0 +1,155 @@
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union
+import json
+import os
+from killer_sudoku.cage import Cage
+from killer_sudoku.killer_sudoku import KillerSudoku
+from killer_sudoku.static_data import cage_sum_combinations
+
+try:
+  import orjson
+  _json_loads = orjson.loads
+except ImportError:
+  _json_loads = json.loads
+
+"""
+Streaming parser for the puzzles/ cage text format
+
+Each line of a puzzle is a cage: its sum followed by the ij coordinates of each of its cells, e.g. 14 07 17 27 28.
+An archive is several puzzles in one file separated by blank lines, a single puzzle file is an archive of one.
+- parse_puzzles(lines): yields a KillerSudoku for each puzzle in an iterable of byte lines
+- read_puzzles(path): yields the puzzles of an archive file, or of every puzzle*.txt file in a directory
+
+JSON puzzles are a list of cages, or an object with a "cages" list and an optional 9x9 "board". A cage is an object
+{"sum": 14, "cells": [[0, 7], [1, 7]]} or a list [14, [[0, 7], [1, 7]]].
+- parse_json_puzzles(data): yields the puzzles of a JSON document holding one puzzle or a list of puzzles
+- parse_ndjson_puzzles(lines): yields the puzzles of newline delimited JSON, one puzzle per line
+JSON is decoded with orjson when it is installed.
+"""
+
+# Characters allowed in the cell coordinates of a cage line
+_coordinate_digits = b'012345678'
+
+def parse_puzzles(lines: Union[bytes, Iterable[bytes]]) -> Iterator[KillerSudoku]:
+  """
+  Lazily parses puzzles from byte lines. Cages are built without validation, and each puzzle is validated
+  in bulk once all of its cages are read
+
+  :param lines: Bytes of an archive, or an iterable of its lines such as a file opened in binary mode
+
+  :return: Iterator of KillerSudoku, one per puzzle
+  :raises ValueError: If a puzzle isn't correctly formatted or isn't a valid Killer Sudoku
+  """
+  if isinstance(lines, (bytes, bytearray)):
+    lines = lines.splitlines()
+  sums: List[int] = []
+  cells: List[List[bytes]] = []
+  for line in lines:
+    tokens = line.split()
+    if tokens:
+      sums.append(int(tokens[0]))
+      cells.append(tokens[1:])
+    elif sums:
+      yield _build_puzzle(sums, cells)
+      sums = []
+      cells = []
+  if sums:
+    yield _build_puzzle(sums, cells)
+
+def read_puzzles(path: Union[str, os.PathLike]) -> Iterator[KillerSudoku]:
+  """
+  Lazily reads puzzles from an archive file, or from every puzzle*.txt file in a directory ordered by name
+
+  :param path: Path to an archive file or a directory
+
+  :return: Iterator of KillerSudoku, one per puzzle
+  :raises ValueError: If a puzzle isn't correctly formatted or isn't a valid Killer Sudoku
+  """
+  if os.path.isdir(path):
+    names = sorted(name for name in os.listdir(path) if name.startswith('puzzle') and name.endswith('.txt'))
+    for name in names:
+      with open(os.path.join(path, name), 'rb') as f:
+        yield from parse_puzzles(f)
+  else:
+    with open(path, 'rb') as f:
+      yield from parse_puzzles(f)
+
+def parse_json_puzzles(data: Union[str, bytes]) -> Iterator[KillerSudoku]:
+  """
+  Parses the puzzles of a JSON document, which holds a single puzzle or a list of puzzles
+
+  :param data: JSON text
+
+  :return: Iterator of KillerSudoku, one per puzzle
+  :raises ValueError: If the JSON isn't valid, or a puzzle isn't correctly formatted or isn't a valid Killer Sudoku
+  """
+  document = _json_loads(data)
+  if isinstance(document, dict) or (isinstance(document, list) and document and _is_cage(document[0])):
+    document = [document]
+  for puzzle in document:
+    yield _build_json_puzzle(puzzle)
+
+def parse_ndjson_puzzles(lines: Union[bytes, Iterable[Union[str, bytes]]]) -> Iterator[KillerSudoku]:
+  """
+  Lazily parses newline delimited JSON with one puzzle per line, skipping blank lines
+
+  :param lines: Bytes of the NDJSON, or an iterable of its lines such as an open file
+
+  :return: Iterator of KillerSudoku, one per puzzle
+  :raises ValueError: If a line isn't valid JSON, or a puzzle isn't correctly formatted or isn't a valid Killer Sudoku
+  """
+  if isinstance(lines, (bytes, bytearray)):
+    lines = lines.splitlines()
+  for line in lines:
+    if line.strip():
+      yield _build_json_puzzle(_json_loads(line))
+
+def _is_cage(value: Any) -> bool:
+  return isinstance(value, dict) or (isinstance(value, list) and len(value) == 2 and isinstance(value[0], int))
+
+def _build_json_puzzle(puzzle: Any) -> KillerSudoku:
+  board = None
+  if isinstance(puzzle, dict):
+    board = puzzle.get('board')
+    puzzle = puzzle['cages']
+  sums = []
+  cells = []
+  for cage in puzzle:
+    if isinstance(cage, dict):
+      sums.append(cage['sum'])
+      cells.append(cage['cells'])
+    else:
+      sums.append(cage[0])
+      cells.append(cage[1])
+
+  # JSON numbers can decode as floats, and 20.0 would pass the cage_sum_combinations lookup below as 20, so sums
+  # and coordinates must be exactly int. bool is rejected too
+  if any(type(cage_sum) is not int for cage_sum in sums):
+    raise ValueError("Cage sums must be integers")
+  # Every coordinate must be an integer in [0-8], checked over the whole puzzle at once
+  coordinates = [coordinate for cage_cells in cells for cell in cage_cells for coordinate in cell]
+  if len(coordinates) != 2 * sum(len(cage_cells) for cage_cells in cells):
+    raise ValueError("Cells must be [i, j] coordinate pairs")
+  if any(type(coordinate) is not int for coordinate in coordinates):
+    raise ValueError("Cell coordinates must be integers")
+  if coordinates and (min(coordinates) < 0 or max(coordinates) > 8):
+    raise ValueError("Cell coordinates must be in the range [0-8]")
+  return _validated_puzzle(sums, [bytes(i * 9 + j for i, j in cage_cells) for cage_cells in cells], board)
+
+def _build_puzzle(sums: List[int], cells: List[List[bytes]]) -> KillerSudoku:
+  # Every coordinate must be 2 characters in [0-8], checked over the whole puzzle at once
+  tokens = [token for cage_cells in cells for token in cage_cells]
+  joined = b''.join(tokens)
+  if len(joined) != 2 * len(tokens) or joined.translate(None, _coordinate_digits):
+    raise ValueError("Cell coordinates must be 2 digits in the range [0-8]")
+  return _validated_puzzle(sums, [bytes(token[0] * 9 + token[1] - 480 for token in cage_cells) for cage_cells in cells])
+
+def _validated_puzzle(sums: Sequence[int], indices: Sequence[bytes], board: Optional[Sequence[Sequence[int]]] = None) -> KillerSudoku:
+  cages = []
+  for cage_sum, cage_indices in zip(sums, indices):
+    if (len(cage_indices), cage_sum) not in cage_sum_combinations:
+      raise ValueError(f"Invalid cage with sum {cage_sum} and {len(cage_indices)} cells")
+    cages.append(Cage._from_indices(cage_sum, cage_indices))
+  # KillerSudoku checks that the cages cover each of the 81 cells exactly once
+  if board is None:
+    return KillerSudoku(cages)
+  return KillerSudoku(cages, board)
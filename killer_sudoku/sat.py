@@ -0,0 +1,367 @@
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+from heapq import heapify, heappop, heappush
+from itertools import combinations
+from killer_sudoku import geometry
+from killer_sudoku.static_data import cage_sum_combinations
+
+try:
+  from pysat.solvers import Solver as _PysatSolver
+except ImportError:
+  _PysatSolver = None
+
+"""
+SAT backend, selected with KillerSudoku.solve(engine="sat")
+
+encode_cnf(ks): CNF over the variables x(idx, d) = idx * 9 + d, true if cell idx holds digit d in [1-9]
+- every cell holds exactly one digit, and every house holds each digit exactly once
+- cage sums use one selector variable per combination of digits in cage_sum_combinations. Exactly one selector
+  of a cage is true, a cell can only hold a digit of the selected combination, and every digit of the selected
+  combination is in some cell of the cage. Digits are unique within a cage, so its cells add up to the cage sum
+- innie and outie virtual cages lying in a house are encoded the same way, which helps propagation
+
+CdclSolver is a bundled conflict-driven clause learning solver in pure Python: two watched literals, first UIP
+learning with non-chronological backjumping, VSIDS variable activities, phase saving and Luby restarts.
+When pysat is installed it's used instead, which is much faster.
+"""
+
+# Number of conflicts in a unit of the Luby restart sequence
+_restart_unit = 64
+
+# Growth of the VSIDS activity increment after each conflict, the same as decaying every activity
+_activity_growth = 1 / 0.95
+
+def cell_variable(idx: int, digit: int) -> int:
+  """
+  Returns the variable that is true if the cell at flat index idx holds the digit
+  """
+  return idx * 9 + digit
+
+def encode_cnf(ks: 'KillerSudoku') -> Tuple[int, List[List[int]]]:
+  """
+  Encodes a puzzle as CNF
+
+  :param KillerSudoku ks: Puzzle to encode
+
+  :return: (number of variables, clauses) with clauses as lists of non-zero DIMACS literals. If a virtual cage
+    of an unsolvable puzzle has a sum no combination reaches, clauses is a single empty clause
+  """
+  clauses = []
+  for idx in range(81):
+    cell = [cell_variable(idx, d) for d in range(1, 10)]
+    clauses.append(cell)
+    clauses.extend([-a, -b] for a, b in combinations(cell, 2))
+    if ks._board[idx]:
+      clauses.append([cell_variable(idx, ks._board[idx])])
+  for cells in geometry.house_cells:
+    for d in range(1, 10):
+      house = [cell_variable(idx, d) for idx in cells]
+      clauses.append(house)
+      clauses.extend([-a, -b] for a, b in combinations(house, 2))
+
+  num_variables = 81 * 9
+  cages = list(ks.cages) + [cage for cage in ks._virtual_cages if cage.distinct]
+  for cage in cages:
+    indices = tuple(cage.indices)
+    if (len(indices), cage.sum) not in cage_sum_combinations:
+      return num_variables, [[]]
+    combos, union_mask = cage_sum_combinations[(len(indices), cage.sum)]
+    selectors = list(range(num_variables + 1, num_variables + len(combos) + 1))
+    num_variables += len(combos)
+    clauses.append(selectors)
+    clauses.extend([-a, -b] for a, b in combinations(selectors, 2))
+    for d in range(1, 10):
+      bit = 1 << (d - 1)
+      cells = [cell_variable(idx, d) for idx in indices]
+      if not union_mask & bit:
+        clauses.extend([-x] for x in cells)
+        continue
+      # Cells sharing a house already can't repeat a digit
+      clauses.extend([-a, -b] for a, b in combinations(cells, 2) if not _share_house(a, b))
+      with_digit = [s for s, combo in zip(selectors, combos) if combo & bit]
+      for x in cells:
+        clauses.append([-x] + with_digit)
+      for s in with_digit:
+        clauses.append([-s] + cells)
+  return num_variables, clauses
+
+def _share_house(a: int, b: int) -> bool:
+  # Whether the cells of two variables share a row, column or subgrid
+  return not set(geometry.cell_houses[(a - 1) // 9]).isdisjoint(geometry.cell_houses[(b - 1) // 9])
+
+class CdclSolver:
+  def __init__(self, num_variables: int, clauses: Iterable[Sequence[int]]):
+    """
+    Initializes a conflict-driven clause learning solver. Literals are stored as 2 * variable for the positive
+    literal and 2 * variable + 1 for the negative one, so negating a literal is lit ^ 1
+
+    :param int num_variables: Number of variables, numbered from 1
+    :param clauses: Clauses as sequences of non-zero DIMACS literals
+    """
+    self.num_variables = num_variables
+    # key: literal, value: 1 if true, 0 if false, 2 if unassigned
+    self._values = [2] * (2 * num_variables + 2)
+    self._levels = [0] * (num_variables + 1)
+    # key: variable, value: index of the clause that implied it, or -1 for decisions
+    self._reasons = [-1] * (num_variables + 1)
+    self._trail = []
+    # Position in the trail of the next literal to propagate
+    self._head = 0
+    # key: trail length at the start of each decision level
+    self._level_starts = []
+    self._clauses = []
+    # key: literal, value: indices of the clauses watching it, visited when it becomes false
+    self._watches = [[] for _ in range(2 * num_variables + 2)]
+    self._activities = [0.0] * (num_variables + 1)
+    self._activity_increment = 1.0
+    self._heap = [(0.0, v) for v in range(1, num_variables + 1)]
+    # Phase saving, every variable is first tried true
+    self._phases = [0] * (num_variables + 1)
+    self._ok = True
+    # Number of decisions and conflicts, reported by the benchmark
+    self.decisions = 0
+    self.conflicts = 0
+    for clause in clauses:
+      self.add_clause(clause)
+
+  def add_clause(self, clause: Sequence[int]) -> None:
+    """
+    Adds a clause before solving. A variable must appear at most once in the clause
+    """
+    literals = [2 * lit if lit > 0 else -2 * lit + 1 for lit in clause]
+    # Only the unit clauses added so far have assigned literals
+    if self._trail:
+      values = self._values
+      if any(values[lit] == 1 for lit in literals):
+        return
+      literals = [lit for lit in literals if values[lit] != 0]
+    if not literals:
+      self._ok = False
+    elif len(literals) == 1:
+      self._assign(literals[0], -1)
+      if self._propagate() is not None:
+        self._ok = False
+    else:
+      self._attach(literals)
+
+  def solve(self) -> Optional[List[int]]:
+    """
+    Returns a model as the list of true DIMACS literals of every variable, or None if the clauses are unsatisfiable
+    """
+    if not self._ok:
+      return None
+    restarts = 0
+    conflicts_until_restart = _luby(restarts) * _restart_unit
+    while True:
+      conflict = self._propagate()
+      if conflict is not None:
+        self.conflicts += 1
+        if not self._level_starts:
+          self._ok = False
+          return None
+        learnt, level = self._analyze(conflict)
+        self._backjump(level)
+        if len(learnt) == 1:
+          self._assign(learnt[0], -1)
+        else:
+          self._assign(learnt[0], self._attach(learnt))
+        self._activity_increment *= _activity_growth
+        conflicts_until_restart -= 1
+        continue
+
+      if conflicts_until_restart <= 0:
+        restarts += 1
+        conflicts_until_restart = _luby(restarts) * _restart_unit
+        self._backjump(0)
+      variable = self._pick_variable()
+      if variable is None:
+        return [v if self._values[2 * v] == 1 else -v for v in range(1, self.num_variables + 1)]
+      self.decisions += 1
+      self._level_starts.append(len(self._trail))
+      self._assign(2 * variable + self._phases[variable], -1)
+
+  def _attach(self, literals: List[int]) -> int:
+    index = len(self._clauses)
+    self._clauses.append(literals)
+    self._watches[literals[0]].append(index)
+    self._watches[literals[1]].append(index)
+    return index
+
+  def _assign(self, lit: int, reason: int) -> None:
+    self._values[lit] = 1
+    self._values[lit ^ 1] = 0
+    variable = lit >> 1
+    self._levels[variable] = len(self._level_starts)
+    self._reasons[variable] = reason
+    self._trail.append(lit)
+
+  def _propagate(self) -> Optional[int]:
+    # Unit propagation from every literal on the trail that wasn't propagated yet.
+    # Returns the index of a falsified clause, or None
+    values, clauses, watches, trail = self._values, self._clauses, self._watches, self._trail
+    head = self._head
+    while head < len(trail):
+      false_lit = trail[head] ^ 1
+      head += 1
+      watching = watches[false_lit]
+      kept = []
+      i = 0
+      n = len(watching)
+      while i < n:
+        index = watching[i]
+        i += 1
+        clause = clauses[index]
+        # The false literal is moved to position 1, position 0 is the other watch
+        if clause[0] == false_lit:
+          clause[0] = clause[1]
+          clause[1] = false_lit
+        first = clause[0]
+        if values[first] == 1:
+          kept.append(index)
+          continue
+        for k in range(2, len(clause)):
+          lit = clause[k]
+          if values[lit] != 0:
+            clause[1] = lit
+            clause[k] = false_lit
+            watches[lit].append(index)
+            break
+        else:
+          kept.append(index)
+          if values[first] == 0:
+            kept.extend(watching[i:])
+            watches[false_lit] = kept
+            self._head = len(trail)
+            return index
+          self._assign(first, index)
+      watches[false_lit] = kept
+    self._head = head
+    return None
+
+  def _analyze(self, conflict: int) -> Tuple[List[int], int]:
+    # First UIP learning: resolve the conflict clause with the reasons of the literals assigned at the current
+    # level, most recent first, until a single literal of the current level is left
+    levels, reasons, clauses, trail = self._levels, self._reasons, self._clauses, self._trail
+    current = len(self._level_starts)
+    seen = set()
+    learnt = [0]
+    pending = 0
+    position = len(trail) - 1
+    clause = clauses[conflict]
+    lit = None
+    while True:
+      for q in (clause if lit is None else clause[1:]):
+        variable = q >> 1
+        if variable not in seen and levels[variable] > 0:
+          seen.add(variable)
+          self._bump(variable)
+          if levels[variable] == current:
+            pending += 1
+          else:
+            learnt.append(q)
+      while trail[position] >> 1 not in seen:
+        position -= 1
+      lit = trail[position]
+      position -= 1
+      pending -= 1
+      if pending == 0:
+        break
+      clause = clauses[reasons[lit >> 1]]
+    learnt[0] = lit ^ 1
+
+    # Backjump to the second highest level in the clause, whose literal becomes the second watch
+    level = 0
+    if len(learnt) > 1:
+      best = 1
+      for k in range(2, len(learnt)):
+        if levels[learnt[k] >> 1] > levels[learnt[best] >> 1]:
+          best = k
+      learnt[1], learnt[best] = learnt[best], learnt[1]
+      level = levels[learnt[1] >> 1]
+    return learnt, level
+
+  def _backjump(self, level: int) -> None:
+    if len(self._level_starts) <= level:
+      return
+    values, trail = self._values, self._trail
+    start = self._level_starts[level]
+    for lit in trail[start:]:
+      variable = lit >> 1
+      values[lit] = 2
+      values[lit ^ 1] = 2
+      self._phases[variable] = lit & 1
+      heappush(self._heap, (-self._activities[variable], variable))
+    del trail[start:]
+    del self._level_starts[level:]
+    self._head = start
+
+  def _bump(self, variable: int) -> None:
+    activity = self._activities[variable] + self._activity_increment
+    self._activities[variable] = activity
+    if activity > 1e100:
+      self._activities = [a * 1e-100 for a in self._activities]
+      self._activity_increment *= 1e-100
+      self._heap = [(-a, v) for v, a in enumerate(self._activities) if v]
+      heapify(self._heap)
+    else:
+      heappush(self._heap, (-activity, variable))
+
+  def _pick_variable(self) -> Optional[int]:
+    # Unassigned variable with the highest activity. Entries are pushed on every bump and unassignment,
+    # so stale entries are skipped
+    heap, values, activities = self._heap, self._values, self._activities
+    while heap:
+      activity, variable = heappop(heap)
+      if values[2 * variable] == 2 and -activity == activities[variable]:
+        return variable
+    return None
+
+def _luby(i: int) -> int:
+  # i-th term of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+  size = 1
+  sequence = 0
+  while size < i + 1:
+    sequence += 1
+    size = 2 * size + 1
+  while size - 1 != i:
+    size = (size - 1) >> 1
+    sequence -= 1
+    i = i % size
+  return 1 << sequence
+
+class SatSolver:
+  def __init__(self, ks: 'KillerSudoku', use_pysat: bool = True):
+    """
+    Encodes a puzzle as CNF
+
+    :param KillerSudoku ks: Puzzle to solve
+    :param bool use_pysat: Solve with pysat when it's installed, otherwise with the bundled CdclSolver
+    """
+    self.ks = ks
+    self.use_pysat = use_pysat and _PysatSolver is not None
+    self.num_variables, self.clauses = encode_cnf(ks)
+    # Number of decisions of the bundled solver, reported by the benchmark as search nodes
+    self.nodes = 0
+    self.conflicts = 0
+
+  def solve(self) -> Union[List[List[int]], None]:
+    """
+    Returns the solved 9x9 board, or None if the puzzle has no solution
+    """
+    if self.clauses == [[]]:
+      return None
+    if self.use_pysat:
+      with _PysatSolver(name='glucose4', bootstrap_with=self.clauses) as solver:
+        model = solver.get_model() if solver.solve() else None
+    else:
+      solver = CdclSolver(self.num_variables, self.clauses)
+      model = solver.solve()
+      self.nodes = solver.decisions
+      self.conflicts = solver.conflicts
+    if model is None:
+      return None
+    board = [[0] * 9 for _ in range(9)]
+    for lit in model:
+      if 0 < lit <= 81 * 9:
+        idx, d = divmod(lit - 1, 9)
+        board[idx // 9][idx % 9] = d + 1
+    return board
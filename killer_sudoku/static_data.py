@@ -10,4 +10,23 @@ possible_cage_sum_min_max = {
   7 : (28, 42),
   8 : (36, 44),
   9 : (45, 45)
-}
\ No newline at end of file
+}
+
+def _build_cage_sum_combinations():
+  table = {}
+  for combo_mask in range(1, 1 << 9):
+    digits = [d for d in range(1, 10) if combo_mask & (1 << (d - 1))]
+    key = (len(digits), sum(digits))
+    table.setdefault(key, []).append(combo_mask)
+  return {key : (tuple(masks), _union(masks)) for key, masks in table.items()}
+
+def _union(masks):
+  union_mask = 0
+  for mask in masks:
+    union_mask |= mask
+  return union_mask
+
+# key: (the number of cells in a cage, the cage sum)
+# value: (bitmasks of every set of unique digits with that size and sum, union of those bitmasks)
+# Digit d is bit (d - 1) of a bitmask, see killer_sudoku.bitmask
+cage_sum_combinations = _build_cage_sum_combinations()
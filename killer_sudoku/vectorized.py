@@ -0,0 +1,293 @@
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+from killer_sudoku import geometry
+from killer_sudoku.batch import CageSource, _chunks, _to_killer_sudoku
+from killer_sudoku.bitmask import all_digits, digit_sum_table, digits_at_least_table, digits_at_most_table, highest_digit_table, lowest_digit_table, popcount_table
+from killer_sudoku.killer_sudoku import KillerSudoku, _Solver
+from killer_sudoku.static_data import cage_sum_combinations
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+"""
+Optional NumPy backend for constraint propagation
+
+VectorizedPuzzles.from_killer_sudokus(puzzles).propagate()
+- candidates: (B, 82) uint16 array of 9-bit candidate masks, one row per puzzle. Column 81 is an always
+  empty padding cell so cages of different sizes can be stored in a (B, C, 9) index matrix
+- cages are followed by the innie and outie virtual cages of each puzzle, which overlap them
+- every round runs naked singles, hidden singles, cage combinations and cage sum bounds over all units of all
+  puzzles at once
+
+solve_batch(sources, batch_size=1024, workers=None, chunksize=16)
+- propagates batches of puzzles together and only runs the per-puzzle search for the puzzles left unsolved,
+  starting from their propagated candidates and fanned out over a process pool like solve_many
+"""
+
+# Index of the padding cell used to fill cage rows with fewer than 9 cells
+_pad = 81
+
+# Status of each puzzle after propagation
+CONTRADICTION = -1
+UNSOLVED = 0
+SOLVED = 1
+
+def _require_numpy() -> None:
+  if np is None:
+    raise ImportError("The vectorized backend requires numpy, install it with pip install numpy")
+
+class _Tables:
+  """
+  Lookup tables and fixed 9x9 geometry as NumPy arrays, built on first use
+  """
+  def __init__(self):
+    self.popcount = np.array(popcount_table, dtype=np.int8)
+    self.lowest = np.array(lowest_digit_table, dtype=np.int16)
+    self.highest = np.array(highest_digit_table, dtype=np.int16)
+    self.at_least = np.array(digits_at_least_table, dtype=np.uint16)
+    self.at_most = np.array(digits_at_most_table, dtype=np.uint16)
+    self.digit_bits = np.array([1 << d for d in range(9)], dtype=np.uint16)
+    self.digit_sum = np.array(digit_sum_table, dtype=np.int16)
+
+    # key: (number of unset cells, residual sum, set values of the cage), value: union of the combinations of
+    # cage_sum_combinations for the cells and sum that don't reuse a set value, 0 if there is none
+    self.combo_union = np.zeros((10, 46, all_digits + 1), dtype=np.uint16)
+    masks = np.arange(all_digits + 1)
+    for (n, cage_sum), (combos, _) in cage_sum_combinations.items():
+      for combo in combos:
+        self.combo_union[n, cage_sum, (masks & combo) == 0] |= combo
+
+    self.house_cells = np.array(geometry.house_cells, dtype=np.intp)
+    self.cell_houses = np.array(geometry.cell_houses, dtype=np.intp)
+
+_tables: Optional[_Tables] = None
+
+def _get_tables() -> _Tables:
+  global _tables
+  _require_numpy()
+  if _tables is None:
+    _tables = _Tables()
+  return _tables
+
+class VectorizedPuzzles:
+  def __init__(self, candidates: 'np.ndarray', cage_cells: 'np.ndarray', cage_sums: 'np.ndarray', cell_cage: 'np.ndarray', cage_distinct: Optional['np.ndarray'] = None):
+    """
+    Initializes a stack of puzzles for vectorized propagation
+
+    :param candidates: (B, 82) uint16 candidate masks, column 81 is padding and must be 0
+    :param cage_cells: (B, C, 9) flat cell indices of each cage, padded with 81
+    :param cage_sums: (B, C) sum of each cage, 0 for padding cages
+    :param cell_cage: (B, 81) index of the cage containing each cell
+    :param cage_distinct: (B, C) whether the values of each cage must be unique, all True if omitted. Virtual
+      cages whose cells don't share a house only constrain the sum
+    """
+    self.tables = _get_tables()
+    self.candidates = candidates
+    self.cage_cells = cage_cells
+    self.cage_sums = cage_sums
+    self.cell_cage = cell_cage
+    self.cage_distinct = np.ones(cage_sums.shape, dtype=bool) if cage_distinct is None else cage_distinct
+    # Flat positions in candidates of the cage cells, sorted so the cages of each cell are adjacent. Virtual cages
+    # overlap the cages, so each cell is narrowed by every cage it is in: the cage masks are ANDed per cell with
+    # reduceat over these runs
+    cells = (np.arange(len(candidates))[:, None, None] * 82 + cage_cells).reshape(-1)
+    self._cage_order = np.argsort(cells, kind='stable')
+    cells = cells[self._cage_order]
+    self._cage_starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    self._cage_targets = cells[self._cage_starts]
+    self.status = np.zeros(len(candidates), dtype=np.int8)
+
+  @classmethod
+  def from_killer_sudokus(cls, puzzles: Sequence[KillerSudoku]) -> 'VectorizedPuzzles':
+    """
+    Stacks the board, cages and virtual cages of each puzzle into padded arrays
+
+    :param Sequence[KillerSudoku] puzzles: Puzzles to propagate together
+    """
+    _require_numpy()
+    num_cages = max((len(ks.cages) + len(ks._virtual_cages) for ks in puzzles), default=0)
+    candidates = np.full((len(puzzles), 82), all_digits, dtype=np.uint16)
+    candidates[:, _pad] = 0
+    cage_cells = np.full((len(puzzles), num_cages, 9), _pad, dtype=np.intp)
+    cage_sums = np.zeros((len(puzzles), num_cages), dtype=np.int16)
+    cage_distinct = np.ones((len(puzzles), num_cages), dtype=bool)
+    cell_cage = np.zeros((len(puzzles), 81), dtype=np.intp)
+    for b, ks in enumerate(puzzles):
+      for c, cage in enumerate(ks.cages):
+        _, union_mask = cage_sum_combinations[(len(cage), cage.sum)]
+        cage_sums[b, c] = cage.sum
+        for k, idx in enumerate(cage.indices):
+          cage_cells[b, c, k] = idx
+          cell_cage[b, idx] = c
+          candidates[b, idx] = union_mask
+      for c, cage in enumerate(ks._virtual_cages, len(ks.cages)):
+        cage_sums[b, c] = cage.sum
+        cage_distinct[b, c] = cage.distinct
+        cage_cells[b, c, :len(cage.indices)] = list(cage.indices)
+      for idx, value in enumerate(ks._board):
+        if value != 0:
+          candidates[b, idx] = 1 << (value - 1)
+    return cls(candidates, cage_cells, cage_sums, cell_cage, cage_distinct)
+
+  def __len__(self) -> int:
+    return len(self.candidates)
+
+  def candidate_array(self, b: int) -> array:
+    """
+    Returns the candidates of puzzle b as a flat 81-slot array, the representation used by the solver
+    """
+    return array('H', self.candidates[b, :81].tolist())
+
+  def propagate(self, max_rounds: Optional[int] = None) -> 'np.ndarray':
+    """
+    Runs propagation rounds over every puzzle until no candidates change
+
+    :param int max_rounds: Stop after this many rounds even if candidates are still changing
+
+    :return: (B,) array with the SOLVED, UNSOLVED or CONTRADICTION status of each puzzle
+    """
+    rounds = 0
+    while max_rounds is None or rounds < max_rounds:
+      rounds += 1
+      reduced = self._reduce(self.candidates)
+      # Puzzles that have hit a contradiction are frozen
+      reduced[self.status == CONTRADICTION] = self.candidates[self.status == CONTRADICTION]
+      if np.array_equal(reduced, self.candidates):
+        break
+      self.candidates = reduced
+    solved = (self.tables.popcount[self.candidates[:, :81]] == 1).all(axis=1)
+    self.status[(self.status != CONTRADICTION) & solved] = SOLVED
+    return self.status
+
+  def _reduce(self, candidates: 'np.ndarray') -> 'np.ndarray':
+    """
+    Runs one round of every vectorized reduction and marks puzzles with a contradiction
+    """
+    t = self.tables
+    batch = np.arange(len(candidates))
+    single = t.popcount[candidates] == 1
+    set_values = np.where(single, candidates, 0).astype(np.uint16)
+
+    # Naked singles: values of set cells in each house and cage, which must be unique
+    house_values = np.bitwise_or.reduce(set_values[:, t.house_cells], axis=2)
+    house_count = single[:, t.house_cells].sum(axis=2)
+    cage_values = np.bitwise_or.reduce(set_values[batch[:, None, None], self.cage_cells], axis=2)
+    cage_count = single[batch[:, None, None], self.cage_cells].sum(axis=2)
+    duplicates = (t.popcount[house_values] != house_count).any(axis=1) | (self.cage_distinct & (t.popcount[cage_values] != cage_count)).any(axis=1)
+
+    taken = np.bitwise_or.reduce(house_values[:, t.cell_houses], axis=2) | cage_values[batch[:, None], self.cell_cage]
+    reduced = candidates.copy()
+    reduced[:, :81] = np.where(single[:, :81], candidates[:, :81], candidates[:, :81] & ~taken)
+
+    # Hidden singles: a digit with a single place left in a house is set in that cell
+    has_digit = (reduced[:, t.house_cells, None] & t.digit_bits) != 0
+    digit_count = has_digit.sum(axis=2)
+    missing = (digit_count == 0).any(axis=(1, 2))
+    once = np.bitwise_or.reduce(np.where(digit_count == 1, t.digit_bits, 0).astype(np.uint16), axis=2)
+    hidden = np.bitwise_or.reduce(once[:, t.cell_houses], axis=2) & reduced[:, :81]
+    reduced[:, :81] = np.where(hidden != 0, hidden, reduced[:, :81])
+
+    # Cage combinations: the unset cells of a cage can only hold digits of a combination that makes up the rest
+    # of the cage sum without reusing a set value, as in the solver's constraint reduce
+    cage_candidates = reduced[batch[:, None, None], self.cage_cells]
+    cage_single = t.popcount[cage_candidates] == 1
+    cage_set = np.bitwise_or.reduce(np.where(cage_single, cage_candidates, 0).astype(np.uint16), axis=2)
+    num_unset = (self.cage_cells != _pad).sum(axis=2) - cage_single.sum(axis=2)
+    residual = self.cage_sums - t.digit_sum[cage_set]
+    combos = t.combo_union[num_unset, np.clip(residual, 0, 45), cage_set]
+    combos[residual < 0] = 0
+    combos[~self.cage_distinct] = all_digits
+    allowed = np.where(cage_single, all_digits, combos[:, :, None]).astype(np.uint16)
+
+    # Cage sum bounds: each digit must leave a sum for the other cells within their min/max range
+    lowest = t.lowest[cage_candidates]
+    highest = t.highest[cage_candidates]
+    sums = self.cage_sums[:, :, None]
+    min_digit = sums - (highest.sum(axis=2, keepdims=True) - highest)
+    max_digit = sums - (lowest.sum(axis=2, keepdims=True) - lowest)
+    allowed &= t.at_least[np.clip(min_digit, 0, 10)] & t.at_most[np.clip(max_digit, 0, 10)]
+    allowed = np.bitwise_and.reduceat(allowed.reshape(-1)[self._cage_order], self._cage_starts)
+    reduced.reshape(-1)[self._cage_targets] &= allowed
+    reduced[:, _pad] = 0
+
+    empty = (reduced[:, :81] == 0).any(axis=1)
+    self.status[duplicates | missing | empty] = CONTRADICTION
+    return reduced
+
+  def board(self, b: int) -> List[List[int]]:
+    """
+    Returns the 9x9 board of puzzle b, with 0 for cells that have more than one candidate
+    """
+    values = [lowest_digit_table[mask] if popcount_table[mask] == 1 else 0 for mask in self.candidates[b, :81].tolist()]
+    return [values[i * 9:i * 9 + 9] for i in range(9)]
+
+def solve_batch(sources: Iterable[CageSource], batch_size: int = 1024, cache: Optional['SolutionCache'] = None, workers: Optional[int] = None, chunksize: int = 16) -> Iterator[Optional[List[List[int]]]]:
+  """
+  Solves many Killer Sudokus by propagating them together, searching only the puzzles propagation leaves unsolved
+
+  :param Iterable sources: Puzzles to solve, in any form accepted by solve_many
+  :param int batch_size: Number of puzzles stacked into one propagation batch
+  :param SolutionCache cache: Cache consulted before solving, solved puzzles are stored in it in bulk
+  :param int workers: Number of worker processes searching the unsolved puzzles, defaults to the number of CPUs.
+    1 searches in the current process
+  :param int chunksize: Number of unsolved puzzles sent to a worker at a time
+
+  :return: Iterator of the solved 9x9 board of each puzzle in order, or None if a puzzle has no solution
+  :raises ValueError: If batch_size, workers or chunksize is less than 1
+  """
+  _require_numpy()
+  if batch_size < 1:
+    raise ValueError("Batch size must be at least 1")
+  if workers is None:
+    workers = os.cpu_count() or 1
+  if workers < 1:
+    raise ValueError("Must have at least 1 worker")
+  if chunksize < 1:
+    raise ValueError("Chunk size must be at least 1")
+  if workers == 1:
+    yield from _solve_batches(iter(sources), batch_size, cache, None, chunksize)
+    return
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+    yield from _solve_batches(iter(sources), batch_size, cache, executor, chunksize)
+
+def _solve_batches(sources: Iterator[CageSource], batch_size: int, cache: Optional['SolutionCache'], executor: Optional[ProcessPoolExecutor], chunksize: int) -> Iterator[Optional[List[List[int]]]]:
+  puzzles = [_to_killer_sudoku(source) for source in islice(sources, batch_size)]
+  while puzzles:
+    boards = [None] * len(puzzles)
+    misses = list(range(len(puzzles)))
+    if cache is not None:
+      keys = [cache.key(ks) for ks in puzzles]
+      misses = []
+      for b, ks in enumerate(puzzles):
+        hit, boards[b] = cache.lookup(ks, keys[b])
+        if not hit:
+          misses.append(b)
+
+    if misses:
+      vp = VectorizedPuzzles.from_killer_sudokus([puzzles[b] for b in misses])
+      status = vp.propagate()
+      unsolved = []
+      for row, b in enumerate(misses):
+        if status[row] == SOLVED:
+          boards[b] = vp.board(row)
+        elif status[row] == UNSOLVED:
+          unsolved.append((b, puzzles[b], vp.candidate_array(row)))
+      # The search starts from the propagated candidates, so workers only get the puzzles left to search
+      chunks = list(_chunks(unsolved, chunksize))
+      results = map(_search_chunk, chunks) if executor is None else executor.map(_search_chunk, chunks)
+      for chunk, chunk_boards in zip(chunks, results):
+        for (b, _, _), board in zip(chunk, chunk_boards):
+          boards[b] = board
+      if cache is not None:
+        cache.store_many((puzzles[b], boards[b], keys[b]) for b in misses)
+
+    yield from boards
+    puzzles = [_to_killer_sudoku(source) for source in islice(sources, batch_size)]
+
+def _search_chunk(chunk: List[Tuple[int, KillerSudoku, array]]) -> List[Optional[List[List[int]]]]:
+  return [_Solver(ks, candidates).solve() for _, ks, candidates in chunk]
@@ -0,0 +1,52 @@
+from hashlib import blake2b
+import os
+import random
+import unittest
+from killer_sudoku import Cage, CageBuilder, KillerSudoku, SolutionCache, canonical_key
+from killer_sudoku.cache import _build_transforms, _encode, key_size
+
+_puzzle_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles', 'puzzle00001.txt')
+
+def _read_puzzle() -> str:
+  with open(_puzzle_path, 'r') as f:
+    return f.read()
+
+def _transformed(ks: KillerSudoku, transform, rng: random.Random) -> KillerSudoku:
+  # The puzzle with every cell moved by the transform, its cages and their cells shuffled
+  cages = [Cage(cage.sum, rng.sample([divmod(transform[idx], 9) for idx in cage.indices], len(cage))) for cage in ks.cages]
+  rng.shuffle(cages)
+  board = [[0] * 9 for _ in range(9)]
+  for idx, value in enumerate(ks.board[i][j] for i in range(9) for j in range(9)):
+    board[transform[idx] // 9][transform[idx] % 9] = value
+  return KillerSudoku(cages, board)
+
+class TestSymmetricKeys(unittest.TestCase):
+  def setUp(self):
+    ks = KillerSudoku(CageBuilder(_read_puzzle()).cages)
+    solution = ks.solve().board
+    # A few set cells so the board is part of the key too
+    board = [[solution[i][j] if (i * 9 + j) % 7 == 0 else 0 for j in range(9)] for i in range(9)]
+    self.ks = KillerSudoku(ks.cages, board)
+    rng = random.Random(0)
+    self.variants = [_transformed(self.ks, transform, rng) for transform in rng.sample(_build_transforms(), 12)]
+
+  def test_same_key(self):
+    key, _ = canonical_key(self.ks, symmetries=True)
+    for variant in self.variants:
+      self.assertEqual(canonical_key(variant, symmetries=True)[0], key)
+
+  def test_matches_exhaustive_minimum(self):
+    # Pruning on the board and first cage must pick the same transform as encoding all 288 of them
+    encoding, transform = min((_encode(self.ks, transform), transform) for transform in _build_transforms())
+    self.assertEqual(canonical_key(self.ks, symmetries=True), (blake2b(encoding, digest_size=key_size).digest(), transform))
+
+  def test_hit_maps_back(self):
+    cache = SolutionCache(symmetries=True)
+    cache.store(self.ks, self.ks.solve().board)
+    for variant in self.variants:
+      hit, board = cache.lookup(variant)
+      self.assertTrue(hit)
+      self.assertEqual(board, variant.solve().board)
+
+if __name__ == '__main__':
+  unittest.main()
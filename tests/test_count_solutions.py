@@ -0,0 +1,35 @@
+import os
+import unittest
+from killer_sudoku import Cage, CageBuilder, KillerSudoku
+
+_puzzle_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles', 'puzzle00001.txt')
+
+def _read_puzzle() -> str:
+  with open(_puzzle_path, 'r') as f:
+    return f.read()
+
+def _row_cages_puzzle() -> KillerSudoku:
+  # Every row as one cage of sum 45, which any filled Sudoku grid satisfies, so there are far more solutions
+  # than any limit used here
+  return KillerSudoku([Cage(45, [(i, j) for j in range(9)]) for i in range(9)])
+
+class TestCountSolutions(unittest.TestCase):
+  def test_unique(self):
+    ks = KillerSudoku(CageBuilder(_read_puzzle()).cages)
+    for max_subset_size in (0, 2, 4):
+      with self.subTest(max_subset_size=max_subset_size):
+        self.assertEqual(ks.count_solutions(max_subset_size=max_subset_size), 1)
+
+  def test_stops_at_limit(self):
+    ks = _row_cages_puzzle()
+    for limit in (1, 2, 50):
+      for max_subset_size in (0, 2, 4):
+        with self.subTest(limit=limit, max_subset_size=max_subset_size):
+          self.assertEqual(ks.count_solutions(limit, max_subset_size=max_subset_size), limit)
+
+  def test_invalid_limit(self):
+    with self.assertRaises(ValueError):
+      _row_cages_puzzle().count_solutions(0)
+
+if __name__ == '__main__':
+  unittest.main()
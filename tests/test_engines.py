@@ -0,0 +1,31 @@
+import os
+import unittest
+from killer_sudoku import CageBuilder, KillerSudoku
+from killer_sudoku.killer_sudoku import engines
+
+_puzzle_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles', 'puzzle00001.txt')
+
+def _read_puzzle() -> str:
+  with open(_puzzle_path, 'r') as f:
+    return f.read()
+
+class TestEngines(unittest.TestCase):
+  def test_solvable(self):
+    ks = KillerSudoku(CageBuilder(_read_puzzle()).cages)
+    expected = ks.solve().board
+    for engine in engines:
+      with self.subTest(engine=engine):
+        self.assertEqual(ks.solve(engine=engine).board, expected)
+
+  def test_unsolvable(self):
+    # Changing the second cage's sum from 27 to 15 keeps every cage valid, but leaves an innie or outie
+    # virtual cage with a sum no combination of its cells reaches
+    lines = _read_puzzle().splitlines()
+    lines[1] = '15' + lines[1][len('27'):]
+    ks = KillerSudoku(CageBuilder('\n'.join(lines)).cages)
+    for engine in engines:
+      with self.subTest(engine=engine):
+        self.assertIsNone(ks.solve(engine=engine))
+
+if __name__ == '__main__':
+  unittest.main()
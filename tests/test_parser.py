@@ -0,0 +1,33 @@
+import json
+import os
+import unittest
+from killer_sudoku.parser import parse_json_puzzles, read_puzzles
+
+_puzzle_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'puzzles', 'puzzle00001.txt')
+
+def _json_cages() -> list:
+  ks = next(read_puzzles(_puzzle_path))
+  return [{'sum': cage.sum, 'cells': [list(cell) for cell in cage.cells]} for cage in ks.cages]
+
+class TestJsonPuzzles(unittest.TestCase):
+  def test_valid(self):
+    cages = _json_cages()
+    ks = next(parse_json_puzzles(json.dumps(cages)))
+    self.assertEqual([(cage.sum, list(cage.cells)) for cage in ks.cages], [(cage['sum'], [tuple(cell) for cell in cage['cells']]) for cage in cages])
+
+  def test_non_integer_sum(self):
+    cages = _json_cages()
+    cages[0]['sum'] = float(cages[0]['sum'])
+    with self.assertRaises(ValueError):
+      next(parse_json_puzzles(json.dumps(cages)))
+
+  def test_non_integer_coordinates(self):
+    for coordinate in ('0', 0.0, True):
+      with self.subTest(coordinate=coordinate):
+        cages = _json_cages()
+        cages[0]['cells'][0][0] = coordinate
+        with self.assertRaises(ValueError):
+          next(parse_json_puzzles(json.dumps(cages)))
+
+if __name__ == '__main__':
+  unittest.main()